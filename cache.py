@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Cache limitado com descarte LRU, validade opcional (TTL) e contadores de acerto/erro
+
+    Com `weigh` o cache também é limitado pelo peso total (ex.: bytes) em
+    `maxweight`; valores mais pesados que `max_item_weight` não são guardados.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 weigh: Optional[Callable[[Any], int]] = None, maxweight: Optional[int] = None,
+                 max_item_weight: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.weigh = weigh
+        self.maxweight = maxweight
+        self.max_item_weight = max_item_weight
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna o valor em cache sem calcular (só acertos são contados; o erro é
+        contado por get_or_compute)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value, _ = entry
+            if expires_at is not None and expires_at <= now:
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou calcula, armazena e retorna"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at is None or expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+
+        # Calcula fora do lock: outra thread pode calcular a mesma chave em paralelo
+        value = compute()
+        if self.maxsize <= 0:
+            return value
+
+        weight = self.weigh(value) if self.weigh else 0
+        if self.max_item_weight is not None and weight > self.max_item_weight:
+            return value
+        if self.maxweight is not None and weight > self.maxweight:
+            return value
+
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, value, weight)
+            self.weight += weight
+            while len(self._data) > self.maxsize or (
+                self.maxweight is not None and self.weight > self.maxweight
+            ):
+                _, (_, _, evicted_weight) = self._data.popitem(last=False)
+                self.weight -= evicted_weight
+        return value
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove uma entrada (com o lock já adquirido)"""
+        _, _, weight = self._data.pop(key)
+        self.weight -= weight
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Estatísticas de uso do cache"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "weight": self.weight,
+            "maxweight": self.maxweight,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,539 @@
+import json
+import math
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from rapidfuzz import fuzz, process
+from unidecode import unidecode
+
+from cache import LRUCache
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele usa o encoder padrão
+    orjson = None
+
+# Exportação JSON do estoque (depuração e fallback do snapshot binário)
+JSON_FILE = "data.json"
+
+# Campos comparados por igualdade após normalização
+EXACT_FIELDS = ["tipo", "marca", "categoria", "cambio", "combustivel"]
+
+# Campos comparados com fuzzy matching
+FUZZY_FIELDS = ["modelo", "titulo", "cor", "opcionais"]
+
+# Pontuação mínima (partial_ratio ou ratio) para aceitar um match fuzzy
+FUZZY_MIN_SCORE = 87
+
+# Quantidade máxima de decisões fuzzy (campo, palavra) memorizadas por snapshot
+FUZZY_MEMO_SIZE = int(os.environ.get("FUZZY_MEMO_SIZE", "4096"))
+
+# =================== NORMALIZAÇÃO =======================
+
+def normalize_text(text: Any) -> str:
+    """Normaliza texto para comparação"""
+    if not text:
+        return ""
+    return unidecode(str(text)).lower().replace("-", "").replace(" ", "").strip()
+
+def convert_price(price_str: Any) -> Optional[float]:
+    """Converte string de preço para float"""
+    if not price_str:
+        return None
+    try:
+        # Se já é um número (float/int), retorna diretamente
+        if isinstance(price_str, (int, float)):
+            return float(price_str)
+        
+        # Se é string, limpa e converte
+        cleaned = str(price_str).replace(",", "").replace("R$", "").replace(".", "").strip()
+        return float(cleaned) / 100 if len(cleaned) > 2 else float(cleaned)
+    except (ValueError, TypeError):
+        return None
+
+def convert_year(year_str: Any) -> Optional[int]:
+    """Converte string de ano para int"""
+    if not year_str:
+        return None
+    try:
+        cleaned = str(year_str).strip().replace('\n', '').replace('\r', '').replace(' ', '')
+        return int(cleaned)
+    except (ValueError, TypeError):
+        return None
+
+def convert_km(km_str: Any) -> Optional[int]:
+    """Converte string de km para int"""
+    if not km_str:
+        return None
+    try:
+        cleaned = str(km_str).replace(".", "").replace(",", "").strip()
+        return int(cleaned)
+    except (ValueError, TypeError):
+        return None
+
+def convert_cc(cc_str: Any) -> Optional[float]:
+    """Converte string de cilindrada para float"""
+    if not cc_str:
+        return None
+    try:
+        # Se já é um número (float/int), retorna diretamente
+        if isinstance(cc_str, (int, float)):
+            return float(cc_str)
+        
+        # Se é string, limpa e converte
+        cleaned = str(cc_str).replace(",", ".").replace("L", "").replace("l", "").strip()
+        # Se o valor for menor que 10, provavelmente está em litros (ex: 1.0, 2.0)
+        # Converte para CC multiplicando por 1000
+        value = float(cleaned)
+        if value < 10:
+            return value * 1000
+        return value
+    except (ValueError, TypeError):
+        return None
+
+# =================== SERIALIZAÇÃO =======================
+
+def dumps_json(obj: Any) -> bytes:
+    """Serializa para JSON compacto em UTF-8 (orjson quando disponível)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass  # ex.: inteiros acima de 64 bits; usa o encoder padrão
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def loads_json(data: Union[bytes, memoryview]) -> Any:
+    """Desserializa JSON em UTF-8 (orjson quando disponível; aceita memoryview)"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # ex.: inteiros acima de 64 bits, NaN; usa o decoder padrão
+    return json.loads(bytes(data))
+
+def simple_view(vehicle: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Projeção do veículo mantendo apenas a primeira foto (modo simples=1)"""
+    fotos = vehicle.get("fotos")
+    if isinstance(fotos, (list, tuple)):
+        return dict(vehicle, fotos=list(fotos[:1]))
+    return vehicle
+
+def freeze_vehicle(vehicle: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Visão somente leitura do veículo (listas, ex.: fotos, viram tuplas)"""
+    return MappingProxyType({
+        key: tuple(value) if isinstance(value, list) else value for key, value in vehicle.items()
+    })
+
+@dataclass(frozen=True, slots=True)
+class VehicleRecord:
+    """Veículo imutável com campos tipados e normalizados calculados uma única vez na carga
+    
+    O veículo completo (data) é decodificado do fragmento JSON a cada leitura e
+    não fica retido no registro; listagens e filtros usam apenas as colunas.
+    """
+    id: str                              # str(id) do veículo (chave do índice de IDs)
+    preco: Optional[float]
+    ano: Optional[int]
+    km: Optional[int]
+    cilindrada: Optional[float]
+    normalized: Dict[str, str]           # campo -> texto normalizado
+    words: Dict[str, Tuple[str, ...]]    # campo fuzzy -> palavras do texto normalizado
+    json: bytes                          # veículo serializado (memoryview do mmap no snapshot binário)
+    json_simple: bytes                   # veículo serializado no modo simples=1
+
+    @property
+    def data(self) -> Mapping[str, Any]:
+        """Veículo somente leitura (ver freeze_vehicle), decodificado a cada acesso"""
+        return freeze_vehicle(loads_json(self.json))
+
+    @classmethod
+    def from_vehicle(cls, vehicle: Dict[str, Any], encoded: Optional[bytes] = None) -> "VehicleRecord":
+        normalized = {
+            field: sys.intern(normalize_text(str(vehicle.get(field, ""))))
+            for field in EXACT_FIELDS + FUZZY_FIELDS
+        }
+        if encoded is None:
+            encoded = dumps_json(vehicle)
+        fotos = vehicle.get("fotos")
+        if isinstance(fotos, list) and len(fotos) > 1:
+            encoded_simple = dumps_json(simple_view(vehicle))
+        else:
+            encoded_simple = encoded
+        return cls(
+            id=str(vehicle.get("id")),
+            preco=convert_price(vehicle.get("preco")),
+            ano=convert_year(vehicle.get("ano")),
+            km=convert_km(vehicle.get("km")),
+            cilindrada=convert_cc(vehicle.get("cilindrada")),
+            normalized=normalized,
+            words={field: tuple(normalized[field].split()) for field in FUZZY_FIELDS},
+            json=encoded,
+            json_simple=encoded_simple,
+        )
+
+    def project(self, fields: Optional[Tuple[str, ...]] = None, simples: bool = False) -> bytes:
+        """Fragmento JSON do veículo: completo, no modo simples ou só com os campos pedidos"""
+        if fields is None:
+            return self.json_simple if simples else self.json
+        # Decodificado só para esta projeção: cópia própria, descartada em seguida
+        vehicle = loads_json(self.json)
+        view = {field: vehicle[field] for field in fields if field in vehicle}
+        return dumps_json(simple_view(view) if simples else view)
+
+
+class NumericColumn:
+    """Coluna numérica ordenada (valor, posição) para consultas de faixa com bisect
+    
+    Aceita qualquer sequência indexável: listas montadas na carga do JSON ou
+    memoryviews sobre o snapshot binário mapeado em memória.
+    """
+
+    def __init__(self, by_position: Sequence[float], present: FrozenSet[int],
+                 values: Optional[Sequence[float]] = None, positions: Optional[Sequence[int]] = None):
+        self.by_position = by_position  # valor por posição (irrelevante onde ausente)
+        self.present = present          # posições com valor
+        if values is None or positions is None:
+            # NaN não entra na ordenação (nunca satisfaz uma comparação de faixa)
+            entries = sorted(
+                (by_position[p], p) for p in present if not math.isnan(by_position[p])
+            )
+            values = array("d", (value for value, _ in entries))
+            positions = array("q", (position for _, position in entries))
+        self.values = values
+        self.positions = positions
+
+    @classmethod
+    def from_records(cls, records: Tuple[VehicleRecord, ...], attribute: str) -> "NumericColumn":
+        by_position = [getattr(r, attribute) for r in records]
+        return cls(by_position, frozenset(p for p, value in enumerate(by_position) if value is not None))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def select(self, candidates: Set[int], low: Optional[float] = None,
+               high: Optional[float] = None) -> Set[int]:
+        """Posições dos candidatos com valor presente e dentro de [low, high]"""
+        if low is None and high is None:
+            return candidates.intersection(self.present)
+        if (low is not None and math.isnan(low)) or (high is not None and math.isnan(high)):
+            return set()
+
+        start = 0 if low is None else bisect_left(self.values, low)
+        end = len(self.values) if high is None else bisect_right(self.values, high)
+        if start >= end or not candidates:
+            return set()
+
+        # Poucos candidatos: verifica cada um; senão intersecta com a fatia da coluna
+        if len(candidates) < end - start:
+            by_position, present = self.by_position, self.present
+            return {
+                p for p in candidates
+                if p in present and
+                (low is None or by_position[p] >= low) and
+                (high is None or by_position[p] <= high)
+            }
+        return candidates.intersection(self.positions[start:end])
+
+    def select_all(self, low: Optional[float] = None, high: Optional[float] = None) -> Set[int]:
+        """Posições de todo o estoque com valor dentro de [low, high]"""
+        if (low is not None and math.isnan(low)) or (high is not None and math.isnan(high)):
+            return set()
+        start = 0 if low is None else bisect_left(self.values, low)
+        end = len(self.values) if high is None else bisect_right(self.values, high)
+        return set(self.positions[start:end])
+
+    def min_value(self, candidates: Set[int]) -> Optional[float]:
+        """Menor valor presente entre os candidatos (O(1) quando o menor global é candidato)"""
+        if len(candidates) < len(self.values) // 4:
+            present = [self.by_position[p] for p in candidates if p in self.present]
+            return min(present) if present else None
+        for value, position in zip(self.values, self.positions):
+            if position in candidates:
+                return value
+        return None
+
+
+class FuzzyIndex:
+    """Vocabulário de valores normalizados distintos de um campo fuzzy -> posições
+    
+    O fuzzy matching roda uma vez por termo do vocabulário (e não por veículo):
+    substring, início de palavra ou, para palavras com 3+ caracteres, pontuação
+    >= FUZZY_MIN_SCORE. As decisões por palavra ficam memorizadas no LRU do snapshot.
+    """
+
+    def __init__(self, records: Tuple[VehicleRecord, ...], field: str, memo: LRUCache):
+        self.field = field
+        self.memo = memo
+        positions_by_term: Dict[str, Set[int]] = {}
+        for position, record in enumerate(records):
+            term = record.normalized[field]
+            if term:  # conteúdo vazio nunca casa
+                positions_by_term.setdefault(term, set()).add(position)
+
+        self.terms: List[str] = list(positions_by_term)
+        self.term_words: List[Tuple[str, ...]] = [tuple(term.split()) for term in self.terms]
+        self.positions: List[FrozenSet[int]] = [frozenset(positions_by_term[t]) for t in self.terms]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def matching_terms(self, normalized_word: str) -> FrozenSet[int]:
+        """Índices dos termos do vocabulário que casam com uma palavra já normalizada"""
+        return self.memo.get_or_compute(
+            (self.field, normalized_word), lambda: frozenset(self._score_terms(normalized_word))
+        )
+
+    def _score_terms(self, normalized_word: str) -> Set[int]:
+        """Avalia a palavra contra todo o vocabulário"""
+        matched = set()
+        for i, term in enumerate(self.terms):
+            # Match exato (substring) ou no início de alguma palavra do conteúdo
+            if normalized_word in term or any(w.startswith(normalized_word) for w in self.term_words[i]):
+                matched.add(i)
+
+        # Match fuzzy para palavras com 3+ caracteres, em lote sobre o restante do vocabulário
+        if len(normalized_word) >= 3 and len(matched) < len(self.terms):
+            remaining = [i for i in range(len(self.terms)) if i not in matched]
+            choices = [self.terms[i] for i in remaining]
+            for scorer in (fuzz.partial_ratio, fuzz.ratio):
+                for _, _, choice_index in process.extract(
+                    normalized_word, choices, scorer=scorer, processor=None,
+                    score_cutoff=FUZZY_MIN_SCORE, limit=None
+                ):
+                    matched.add(remaining[choice_index])
+        return matched
+
+    def match_positions(self, normalized_words: List[str]) -> Set[int]:
+        """Posições dos veículos cujo campo casa com alguma das palavras"""
+        positions: Set[int] = set()
+        for word in normalized_words:
+            for i in self.matching_terms(word):
+                positions.update(self.positions[i])
+        return positions
+
+
+class InventorySnapshot:
+    """Snapshot imutável do estoque, carregado uma única vez em memória"""
+
+    def __init__(
+        self,
+        vehicles: List[Union[Dict[str, Any], VehicleRecord]],
+        updated_at: Optional[str] = None,
+        previous: Optional["InventorySnapshot"] = None,
+        records: Optional[Tuple[VehicleRecord, ...]] = None,
+        version: Optional[int] = None,
+        columns: Optional[Dict[str, NumericColumn]] = None,
+        price_order: Optional[Sequence[int]] = None,
+    ):
+        """`columns` e `price_order` já prontos (ex.: snapshot binário) dispensam a ordenação"""
+        if records is None:
+            records = self._build_records(vehicles, previous)
+        else:
+            self.reused_records = 0  # registros já prontos (ex.: snapshot binário)
+        self.records: Tuple[VehicleRecord, ...] = records
+        self.id_index = self._build_id_index()
+        self.exact_index = self._build_exact_index()
+        columns = dict(columns or {})
+        for attribute in ("preco", "ano", "km", "cilindrada"):
+            if attribute not in columns:
+                columns[attribute] = NumericColumn.from_records(self.records, attribute)
+        self.columns: Dict[str, NumericColumn] = columns
+        self.price_column = columns["preco"]
+        # Ordem da listagem completa: preço decrescente (estável, sem preço conta como 0)
+        self.price_order: Sequence[int] = price_order if price_order is not None else tuple(
+            sorted(range(len(self.records)), key=lambda p: self.records[p].preco or 0, reverse=True)
+        )
+        self.year_column = columns["ano"]
+        self.km_column = columns["km"]
+        self.cc_column = columns["cilindrada"]
+        self.fuzzy_memo = LRUCache(FUZZY_MEMO_SIZE)
+        self.fuzzy_index = {
+            field: FuzzyIndex(self.records, field, self.fuzzy_memo) for field in FUZZY_FIELDS
+        }
+        if previous is not None and all(
+            self.fuzzy_index[f].terms == previous.fuzzy_index[f].terms for f in FUZZY_FIELDS
+        ):
+            # Vocabulário idêntico: as decisões fuzzy memorizadas continuam válidas
+            self.fuzzy_memo = previous.fuzzy_memo
+            for index in self.fuzzy_index.values():
+                index.memo = self.fuzzy_memo
+        self.diff = self._diff(previous)
+        self.updated_at = updated_at
+        self.version = version if version is not None else next_snapshot_version()
+        self.loaded_at = datetime.now().isoformat()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _build_records(
+        self, vehicles: List[Union[Dict[str, Any], VehicleRecord]], previous: Optional["InventorySnapshot"]
+    ) -> Tuple[VehicleRecord, ...]:
+        """Registros do snapshot, reaproveitando os do snapshot anterior cujo conteúdo não mudou
+        
+        Aceita veículos (ex.: data.json) ou registros já derivados pelo fetcher. O
+        conteúdo serializado do veículo serve de hash: registros idênticos ao
+        anterior não são normalizados nem convertidos de novo.
+        """
+        reusable = {r.json: r for r in previous.records} if previous is not None else {}
+        records = []
+        self.reused_records = 0
+        for vehicle in vehicles:
+            if isinstance(vehicle, VehicleRecord):
+                encoded = vehicle.json
+            else:
+                encoded = dumps_json(vehicle)
+            record = reusable.get(encoded)
+            if record is not None:
+                self.reused_records += 1
+            elif isinstance(vehicle, VehicleRecord):
+                record = vehicle
+            else:
+                record = VehicleRecord.from_vehicle(vehicle, encoded)
+            records.append(record)
+        return tuple(records)
+
+    @staticmethod
+    def _contents_by_id(records: Tuple[VehicleRecord, ...]) -> Dict[Tuple[str, int], bytes]:
+        """Conteúdo de cada veículo por (id, ocorrência): IDs repetidos entre feeds não se fundem"""
+        occurrences: Dict[str, int] = {}
+        contents = {}
+        for record in records:
+            key = record.id
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            contents[(key, occurrence)] = record.json
+        return contents
+
+    def _diff(self, previous: Optional["InventorySnapshot"]) -> Dict[str, Any]:
+        """Resumo das diferenças por id em relação ao snapshot anterior"""
+        current = self._contents_by_id(self.records)
+        if previous is None:
+            return {
+                "base_version": None,
+                "added": len(current),
+                "removed": 0,
+                "changed": 0,
+                "unchanged": 0,
+                "reused_records": self.reused_records,
+            }
+
+        before = self._contents_by_id(previous.records)
+        changed = sum(1 for key, encoded in current.items() if key in before and before[key] != encoded)
+        added = sum(1 for key in current if key not in before)
+        removed = sum(1 for key in before if key not in current)
+        return {
+            "base_version": previous.version,
+            "added": added,
+            "removed": removed,
+            "changed": changed,
+            "unchanged": len(current) - added - changed,
+            "reused_records": self.reused_records,
+        }
+
+    def _build_id_index(self) -> Dict[str, Tuple[int, ...]]:
+        """Índice str(id) -> posições dos veículos (em ordem; IDs podem se repetir entre feeds)"""
+        index: Dict[str, List[int]] = {}
+        for position, record in enumerate(self.records):
+            index.setdefault(record.id, []).append(position)
+        return {key: tuple(positions) for key, positions in index.items()}
+
+    def find_by_id(self, vehicle_id: Any) -> Optional[VehicleRecord]:
+        """Primeiro veículo com o ID informado"""
+        positions = self.id_index.get(str(vehicle_id))
+        return self.records[positions[0]] if positions else None
+
+    def positions_for_ids(self, vehicle_ids: Iterable[Any]) -> Set[int]:
+        """Posições de todos os veículos com algum dos IDs informados"""
+        positions: Set[int] = set()
+        for vehicle_id in vehicle_ids:
+            positions.update(self.id_index.get(str(vehicle_id), ()))
+        return positions
+
+    def _build_exact_index(self) -> Dict[str, Dict[str, FrozenSet[int]]]:
+        """Índice invertido campo -> valor normalizado -> posições dos veículos"""
+        index: Dict[str, Dict[str, Set[int]]] = {field: {} for field in EXACT_FIELDS}
+        for position, record in enumerate(self.records):
+            for field in EXACT_FIELDS:
+                index[field].setdefault(record.normalized[field], set()).add(position)
+        return {
+            field: {value: frozenset(positions) for value, positions in values.items()}
+            for field, values in index.items()
+        }
+
+
+# Última versão de snapshot atribuída (monotônica, semeada a partir dos snapshots em disco)
+_last_version = 0
+_version_lock = threading.Lock()
+
+# Snapshot corrente do processo (substituído atomicamente a cada atualização)
+_current_snapshot: Optional[InventorySnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def next_snapshot_version() -> int:
+    """Reserva a próxima versão de snapshot"""
+    global _last_version
+    with _version_lock:
+        _last_version += 1
+        return _last_version
+
+
+def advance_snapshot_version(version: int) -> None:
+    """Garante que as próximas versões sejam maiores que `version` (ex.: a última gravada em disco)"""
+    global _last_version
+    with _version_lock:
+        _last_version = max(_last_version, version)
+
+
+def get_snapshot() -> Optional[InventorySnapshot]:
+    """Retorna o snapshot corrente (ou None se nenhum dado foi carregado ainda)"""
+    return _current_snapshot
+
+
+def install_snapshot(data_dict: Dict[str, Any]) -> InventorySnapshot:
+    """Constrói um novo snapshot a partir do resultado do fetcher e o instala"""
+    vehicles = data_dict.get("veiculos", [])
+    if not isinstance(vehicles, list):
+        raise ValueError("Formato inválido: 'veiculos' deve ser uma lista")
+
+    # Constrói fora do lock: leitores continuam usando o snapshot anterior,
+    # que também fornece os registros reaproveitados no diff incremental
+    snapshot = InventorySnapshot(vehicles, data_dict.get("_updated_at"), previous=_current_snapshot)
+    return activate_snapshot(snapshot)
+
+
+def activate_snapshot(snapshot: InventorySnapshot) -> InventorySnapshot:
+    """Torna um snapshot já construído o snapshot corrente"""
+    global _current_snapshot
+
+    with _snapshot_lock:
+        _current_snapshot = snapshot
+
+    diff = snapshot.diff
+    print(f"[INFO] Diff do estoque: +{diff['added']} -{diff['removed']} ~{diff['changed']} "
+          f"({diff['reused_records']}/{len(snapshot)} registros reaproveitados)")
+    return snapshot
+
+
+def load_snapshot_from_disk(path: str = JSON_FILE) -> Optional[InventorySnapshot]:
+    """Reconstrói o snapshot a partir do arquivo salvo pela última atualização"""
+    if not os.path.exists(path):
+        print(f"[INFO] Arquivo {path} não encontrado, aguardando primeira atualização")
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        snapshot = install_snapshot(data)
+        print(f"[OK] Snapshot carregado de {path}: {len(snapshot)} veículos")
+        return snapshot
+    except (json.JSONDecodeError, ValueError, KeyError, AttributeError, OSError) as e:
+        print(f"[ERRO] Erro ao carregar snapshot de {path}: {e}")
+        return None
@@ -1,14 +1,25 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from unidecode import unidecode
-from rapidfuzz import fuzz
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from apscheduler.schedulers.background import BackgroundScheduler
 from xml_fetcher import fetch_and_convert_xml
+from cache import LRUCache
+from inventory import (
+    InventorySnapshot, VehicleRecord, get_snapshot, install_snapshot,
+    dumps_json, normalize_text
+)
+from snapshot_store import load_latest_snapshot, save_snapshot
+from storage import atomic_open
+from matcher import KeywordMatcher
+import heapq
 import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional, Any, Tuple
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Any, Set, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
 
 app = FastAPI()
 
@@ -29,6 +40,24 @@ FALLBACK_PRIORITY = [
 # Prioridade para parâmetros de range
 RANGE_FALLBACK = ["CcMax", "KmMax", "AnoMax", "ValorMax"]
 
+# Quantidade máxima de veículos retornados por busca
+MAX_RESULTS = 6
+
+# Cache de respostas: quantidade de consultas distintas e validade em segundos
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+
+# Limites de memória do cache de respostas: total de bytes dos corpos e tamanho máximo de um corpo
+# (listagens maiores são remontadas a partir da ordem de preço do snapshot, sem cache)
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ITEM_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_ITEM_BYTES", str(1024 * 1024)))
+
+# Maior página aceita em limit= (valores acima são reduzidos a este)
+MAX_PAGE_LIMIT = max(1, int(os.environ.get("MAX_PAGE_LIMIT", "500")))
+
+# Veículos serializados por parte enviada nas respostas em streaming
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", "100"))
+
 # Mapeamento de categorias por modelo - Organizado por categoria
 MAPEAMENTO_CATEGORIAS = {}
 
@@ -92,10 +121,25 @@ offroad_models = ["wrangler", "troller", "defender", "bronco", "samurai", "jimny
 for model in offroad_models:
     MAPEAMENTO_CATEGORIAS[model] = "off-road"
 
+# Chaves de MAPEAMENTO_CATEGORIAS normalizadas e compiladas uma única vez
+CATEGORIA_MATCHER = KeywordMatcher(MAPEAMENTO_CATEGORIAS, normalize_text)
+
+@lru_cache(maxsize=4096)
+def category_for_normalized_model(normalized_model: str) -> Optional[str]:
+    """Categoria de um modelo já normalizado (memorizada por modelo)
+    
+    Ordem: chave exata, depois a chave mais longa contida no modelo e, por
+    último, a primeira chave da tabela que contém o modelo.
+    """
+    if normalized_model in CATEGORIA_MATCHER.values:
+        return CATEGORIA_MATCHER.values[normalized_model]
+    key = CATEGORIA_MATCHER.longest_contained(normalized_model) or CATEGORIA_MATCHER.first_containing(normalized_model)
+    return CATEGORIA_MATCHER.values[key] if key else None
+
 @dataclass
 class SearchResult:
     """Resultado de uma busca com informações de fallback"""
-    vehicles: List[Dict[str, Any]]
+    vehicles: List[VehicleRecord]
     total_found: int
     fallback_info: Dict[str, Any]
     removed_filters: List[str]
@@ -108,106 +152,28 @@ class VehicleSearchEngine:
         
     def normalize_text(self, text: str) -> str:
         """Normaliza texto para comparação"""
-        if not text:
-            return ""
-        return unidecode(str(text)).lower().replace("-", "").replace(" ", "").strip()
-    
-    def convert_price(self, price_str: Any) -> Optional[float]:
-        """Converte string de preço para float"""
-        if not price_str:
-            return None
-        try:
-            # Se já é um número (float/int), retorna diretamente
-            if isinstance(price_str, (int, float)):
-                return float(price_str)
-            
-            # Se é string, limpa e converte
-            cleaned = str(price_str).replace(",", "").replace("R$", "").replace(".", "").strip()
-            return float(cleaned) / 100 if len(cleaned) > 2 else float(cleaned)
-        except (ValueError, TypeError):
-            return None
-    
-    def convert_year(self, year_str: Any) -> Optional[int]:
-        """Converte string de ano para int"""
-        if not year_str:
-            return None
-        try:
-            cleaned = str(year_str).strip().replace('\n', '').replace('\r', '').replace(' ', '')
-            return int(cleaned)
-        except (ValueError, TypeError):
-            return None
-    
-    def convert_km(self, km_str: Any) -> Optional[int]:
-        """Converte string de km para int"""
-        if not km_str:
-            return None
-        try:
-            cleaned = str(km_str).replace(".", "").replace(",", "").strip()
-            return int(cleaned)
-        except (ValueError, TypeError):
-            return None
-    
-    def convert_cc(self, cc_str: Any) -> Optional[float]:
-        """Converte string de cilindrada para float"""
-        if not cc_str:
-            return None
-        try:
-            # Se já é um número (float/int), retorna diretamente
-            if isinstance(cc_str, (int, float)):
-                return float(cc_str)
-            
-            # Se é string, limpa e converte
-            cleaned = str(cc_str).replace(",", ".").replace("L", "").replace("l", "").strip()
-            # Se o valor for menor que 10, provavelmente está em litros (ex: 1.0, 2.0)
-            # Converte para CC multiplicando por 1000
-            value = float(cleaned)
-            if value < 10:
-                return value * 1000
-            return value
-        except (ValueError, TypeError):
-            return None
+        return normalize_text(text)
     
     def find_category_by_model(self, model: str) -> Optional[str]:
         """Encontra categoria baseada no modelo usando mapeamento"""
         if not model:
             return None
-            
-        # Normaliza o modelo para busca
-        normalized_model = self.normalize_text(model)
-        
-        # Busca exata primeiro
-        if normalized_model in MAPEAMENTO_CATEGORIAS:
-            return MAPEAMENTO_CATEGORIAS[normalized_model]
-        
-        # Busca parcial - verifica se alguma palavra do modelo está no mapeamento
-        model_words = normalized_model.split()
-        for word in model_words:
-            if len(word) >= 3 and word in MAPEAMENTO_CATEGORIAS:
-                return MAPEAMENTO_CATEGORIAS[word]
-        
-        # Busca por substring - verifica se o modelo contém alguma chave do mapeamento
-        for key, category in MAPEAMENTO_CATEGORIAS.items():
-            if key in normalized_model or normalized_model in key:
-                return category
-        
-        return None
+        return category_for_normalized_model(self.normalize_text(model))
     
-    def model_exists_in_database(self, vehicles: List[Dict], model_query: str) -> bool:
+    def model_exists_in_database(self, snapshot: InventorySnapshot, model_query: str,
+                                 match_cache: Optional[Dict] = None) -> bool:
         """Verifica se um modelo existe no banco de dados usando fuzzy matching"""
         if not model_query:
             return False
             
-        query_words = model_query.split()
-        
-        for vehicle in vehicles:
-            # Verifica nos campos de modelo e titulo (onde modelo é buscado)
-            for field in ["modelo", "titulo"]:
-                field_value = str(vehicle.get(field, ""))
-                if field_value:
-                    is_match, _ = self.fuzzy_match(query_words, field_value)
-                    if is_match:
-                        return True
-        return False
+        query_words = self.normalize_query_words(model_query.split())
+        
+        # Verifica nos campos de modelo e titulo (onde modelo é buscado), pelo vocabulário
+        positions = self.cached_match(
+            match_cache, ("modelo", tuple(query_words)),
+            lambda: self.fuzzy_match_positions(snapshot, "modelo", query_words)
+        )
+        return bool(positions)
     
     def split_multi_value(self, value: str) -> List[str]:
         """Divide valores múltiplos separados por vírgula"""
@@ -215,120 +181,93 @@ class VehicleSearchEngine:
             return []
         return [v.strip() for v in str(value).split(',') if v.strip()]
     
-    def fuzzy_match(self, query_words: List[str], field_content: str) -> Tuple[bool, str]:
-        """Verifica se há match fuzzy entre as palavras da query e o conteúdo do campo"""
-        if not query_words or not field_content:
-            return False, "empty_input"
-            
-        normalized_content = self.normalize_text(field_content)
-        
-        for word in query_words:
-            normalized_word = self.normalize_text(word)
-            if len(normalized_word) < 2:
+    def split_query_words(self, value: str) -> List[str]:
+        """Divide um filtro multi-valor em todas as suas palavras"""
+        all_words = []
+        for val in self.split_multi_value(value):
+            all_words.extend(val.split())
+        return all_words
+    
+    def normalize_query_words(self, query_words: List[str]) -> List[str]:
+        """Normaliza as palavras da query uma única vez (ignora palavras muito curtas)"""
+        normalized_words = [self.normalize_text(word) for word in query_words]
+        return [word for word in normalized_words if len(word) >= 2]
+    
+    def cached_match(self, match_cache: Optional[Dict], key: Tuple, compute) -> Set[int]:
+        """Retorna o conjunto de posições do cache da requisição, calculando-o se necessário"""
+        if match_cache is None:
+            return compute()
+        if key not in match_cache:
+            match_cache[key] = compute()
+        return match_cache[key]
+    
+    def fuzzy_match_positions(self, snapshot: InventorySnapshot, filter_key: str,
+                              query_words: List[str]) -> Set[int]:
+        """Posições de todos os veículos do snapshot que casam com um filtro fuzzy"""
+        # Filtro de modelo busca em 'modelo' e 'titulo'; cor e opcionais apenas no próprio campo
+        fields = ("modelo", "titulo") if filter_key == "modelo" else (filter_key,)
+        positions: Set[int] = set()
+        for field in fields:
+            positions.update(snapshot.fuzzy_index[field].match_positions(query_words))
+        return positions
+    
+    def apply_filters(self, snapshot: InventorySnapshot, filters: Dict[str, str],
+                      match_cache: Optional[Dict] = None) -> Set[int]:
+        """Aplica filtros aos veículos, retornando as posições que atendem a todos
+        
+        O conjunto de cada filtro é calculado sobre o estoque inteiro e guardado em
+        match_cache, para que os passos de fallback só combinem conjuntos já prontos.
+        """
+        positions: Optional[Set[int]] = None  # None = nenhum filtro aplicado ainda
+        
+        # Filtros exatos (tipo, marca, categoria, cambio, combustivel) via índice invertido:
+        # união dos valores pedidos em cada campo, interseção entre campos
+        for filter_key in self.exact_fields:
+            filter_value = filters.get(filter_key)
+            if not filter_value:
                 continue
-                
-            # Match exato (substring)
-            if normalized_word in normalized_content:
-                return True, f"exact_match: {normalized_word}"
             
-            # Match no início da palavra (para casos como "ram" em "rampage")
-            content_words = normalized_content.split()
-            for content_word in content_words:
-                if content_word.startswith(normalized_word):
-                    return True, f"starts_with_match: {normalized_word}"
-                    
-            # Match fuzzy para palavras com 3+ caracteres
-            if len(normalized_word) >= 3:
-                # Verifica se a palavra da query está contida em alguma palavra do conteúdo
-                for content_word in content_words:
-                    if normalized_word in content_word:
-                        return True, f"substring_match: {normalized_word} in {content_word}"
-                
-                # Fuzzy matching tradicional
-                partial_score = fuzz.partial_ratio(normalized_content, normalized_word)
-                ratio_score = fuzz.ratio(normalized_content, normalized_word)
-                max_score = max(partial_score, ratio_score)
-                
-                if max_score >= 87:
-                    return True, f"fuzzy_match: {max_score}"
-        
-        return False, "no_match"
-    
-    def apply_filters(self, vehicles: List[Dict], filters: Dict[str, str]) -> List[Dict]:
-        """Aplica filtros aos veículos"""
-        if not filters:
-            return vehicles
+            normalized_values = frozenset(
+                self.normalize_text(value) for value in self.split_multi_value(filter_value)
+            )
+            index = snapshot.exact_index[filter_key]
+            matched = self.cached_match(
+                match_cache, (filter_key, normalized_values),
+                lambda: set().union(*(index.get(value, ()) for value in normalized_values))
+            )
             
-        filtered_vehicles = list(vehicles)
+            positions = set(matched) if positions is None else positions & matched
         
-        for filter_key, filter_value in filters.items():
-            if not filter_value or not filtered_vehicles:
+        # Filtros fuzzy (modelo, cor, opcionais)
+        for filter_key in ("modelo", "cor", "opcionais"):
+            filter_value = filters.get(filter_key)
+            if not filter_value or positions == set():
                 continue
             
-            if filter_key == "modelo":
-                # Filtro de modelo: busca em 'modelo' e 'titulo' com fuzzy
-                multi_values = self.split_multi_value(filter_value)
-                all_words = []
-                for val in multi_values:
-                    all_words.extend(val.split())
-                
-                filtered_vehicles = [
-                    v for v in filtered_vehicles
-                    if (self.fuzzy_match(all_words, str(v.get("modelo", "")))[0] or 
-                        self.fuzzy_match(all_words, str(v.get("titulo", "")))[0])
-                ]
-                
-            elif filter_key == "cor":
-                # Filtro de cor: busca apenas no campo 'cor' com fuzzy
-                multi_values = self.split_multi_value(filter_value)
-                all_words = []
-                for val in multi_values:
-                    all_words.extend(val.split())
-                
-                filtered_vehicles = [
-                    v for v in filtered_vehicles
-                    if self.fuzzy_match(all_words, str(v.get("cor", "")))[0]
-                ]
-                
-            elif filter_key == "opcionais":
-                # Filtro de opcionais: busca apenas no campo 'opcionais' com fuzzy
-                multi_values = self.split_multi_value(filter_value)
-                all_words = []
-                for val in multi_values:
-                    all_words.extend(val.split())
-                
-                filtered_vehicles = [
-                    v for v in filtered_vehicles
-                    if self.fuzzy_match(all_words, str(v.get("opcionais", "")))[0]
-                ]
-                
-            elif filter_key in self.exact_fields:
-                # Filtros exatos (tipo, marca, categoria, cambio, combustivel)
-                normalized_values = [
-                    self.normalize_text(v) for v in self.split_multi_value(filter_value)
-                ]
-                
-                filtered_vehicles = [
-                    v for v in filtered_vehicles
-                    if self.normalize_text(str(v.get(filter_key, ""))) in normalized_values
-                ]
+            query_words = self.normalize_query_words(self.split_query_words(filter_value))
+            matched = self.cached_match(
+                match_cache, (filter_key, tuple(query_words)),
+                lambda: self.fuzzy_match_positions(snapshot, filter_key, query_words)
+            )
+            
+            positions = set(matched) if positions is None else positions & matched
         
-        return filtered_vehicles
+        return set(range(len(snapshot))) if positions is None else positions
     
-    def apply_range_filters(self, vehicles: List[Dict], valormax: Optional[str], 
-                          anomax: Optional[str], kmmax: Optional[str], ccmax: Optional[str]) -> List[Dict]:
-        """Aplica filtros de faixa com expansão automática"""
-        filtered_vehicles = list(vehicles)
+    def apply_range_filters(self, snapshot: InventorySnapshot, positions: Set[int], valormax: Optional[str], 
+                          anomax: Optional[str], kmmax: Optional[str], ccmax: Optional[str],
+                          match_cache: Optional[Dict] = None) -> Set[int]:
+        """Aplica filtros de faixa com expansão automática (consultas nas colunas ordenadas)"""
+        filtered_positions = set(positions)
         
         # Filtro de valor máximo - expande automaticamente até 25k acima
         if valormax:
             try:
                 max_price = float(valormax) + 25000  # Adiciona 25k automaticamente
-                filtered_vehicles = [
-                    v for v in filtered_vehicles
-                    if self.convert_price(v.get("preco")) is not None and
-                    self.convert_price(v.get("preco")) <= max_price
-                ]
+                filtered_positions &= self.cached_match(
+                    match_cache, ("ValorMax", max_price),
+                    lambda: snapshot.price_column.select_all(high=max_price)
+                )
             except ValueError:
                 pass
         
@@ -338,11 +277,10 @@ class VehicleSearchEngine:
                 target_year = int(anomax)
                 min_year = target_year - 3  # Vai 3 anos para baixo
                 
-                filtered_vehicles = [
-                    v for v in filtered_vehicles
-                    if self.convert_year(v.get("ano")) is not None and
-                    self.convert_year(v.get("ano")) >= min_year
-                ]
+                filtered_positions &= self.cached_match(
+                    match_cache, ("AnoMax", min_year),
+                    lambda: snapshot.year_column.select_all(low=min_year)
+                )
                 
             except ValueError:
                 pass
@@ -353,16 +291,10 @@ class VehicleSearchEngine:
                 target_km = int(kmmax)
                 max_km_with_margin = target_km + 30000  # Adiciona 30k de margem
                 
-                # Filtra veículos que têm informação de KM
-                vehicles_with_km = [
-                    v for v in filtered_vehicles
-                    if self.convert_km(v.get("km")) is not None
-                ]
+                # Encontra o menor KM disponível entre os veículos que têm informação de KM
+                min_km_available = snapshot.km_column.min_value(filtered_positions)
                 
-                if vehicles_with_km:
-                    # Encontra o menor KM disponível
-                    min_km_available = min(self.convert_km(v.get("km")) for v in vehicles_with_km)
-                    
+                if min_km_available is not None:
                     # Se o menor KM disponível é maior que o target, ancora no menor disponível
                     if min_km_available > target_km:
                         min_km_filter = min_km_available
@@ -370,11 +302,9 @@ class VehicleSearchEngine:
                         min_km_filter = 0  # Busca desde 0 se há KMs menores que o target
                     
                     # Aplica o filtro: do menor (ou âncora) até o máximo com margem
-                    filtered_vehicles = [
-                        v for v in filtered_vehicles
-                        if self.convert_km(v.get("km")) is not None and
-                        min_km_filter <= self.convert_km(v.get("km")) <= max_km_with_margin
-                    ]
+                    filtered_positions = snapshot.km_column.select(
+                        filtered_positions, low=min_km_filter, high=max_km_with_margin
+                    )
             except ValueError:
                 pass
         
@@ -386,21 +316,21 @@ class VehicleSearchEngine:
                 if target_cc < 10:
                     target_cc *= 1000
                 
-                filtered_vehicles = [
-                    v for v in filtered_vehicles
-                    if self.convert_cc(v.get("cilindrada")) is not None
-                ]
+                filtered_positions = snapshot.cc_column.select(filtered_positions)
             except ValueError:
                 pass
         
-        return filtered_vehicles
+        return filtered_positions
     
-    def sort_vehicles(self, vehicles: List[Dict], valormax: Optional[str], 
-                     anomax: Optional[str], kmmax: Optional[str], ccmax: Optional[str]) -> List[Dict]:
-        """Ordena veículos baseado nos filtros aplicados"""
-        if not vehicles:
-            return vehicles
-        
+    def exclude_ids(self, snapshot: InventorySnapshot, positions: Set[int], excluded_ids: set) -> Set[int]:
+        """Remove das posições os veículos cujos IDs foram excluídos"""
+        if not excluded_ids:
+            return positions
+        return positions - snapshot.positions_for_ids(excluded_ids)
+    
+    def sort_key(self, valormax: Optional[str], anomax: Optional[str], kmmax: Optional[str],
+                 ccmax: Optional[str]) -> Tuple[Callable[[VehicleRecord], float], bool]:
+        """Retorna a chave de ordenação (e se é decrescente) baseada nos filtros aplicados"""
         # Prioridade 1: Se tem CcMax, ordena por proximidade da cilindrada
         if ccmax:
             try:
@@ -409,21 +339,19 @@ class VehicleSearchEngine:
                 if target_cc < 10:
                     target_cc *= 1000
                     
-                return sorted(vehicles, key=lambda v: 
-                    abs((self.convert_cc(v.get("cilindrada")) or 0) - target_cc))
+                return (lambda r: abs((r.cilindrada or 0) - target_cc)), False
             except ValueError:
                 pass
         
         # Prioridade 2: Se tem KmMax, ordena por KM crescente
         if kmmax:
-            return sorted(vehicles, key=lambda v: self.convert_km(v.get("km")) or float('inf'))
+            return (lambda r: r.km or float('inf')), False
         
         # Prioridade 3: Se tem ValorMax, ordena por proximidade do valor
         if valormax:
             try:
                 target_price = float(valormax)
-                return sorted(vehicles, key=lambda v: 
-                    abs((self.convert_price(v.get("preco")) or 0) - target_price))
+                return (lambda r: abs((r.preco or 0) - target_price)), False
             except ValueError:
                 pass
         
@@ -431,35 +359,59 @@ class VehicleSearchEngine:
         if anomax:
             try:
                 target_year = int(anomax)
-                return sorted(vehicles, key=lambda v: 
-                    abs((self.convert_year(v.get("ano")) or 0) - target_year))
+                return (lambda r: abs((r.ano or 0) - target_year)), False
             except ValueError:
                 pass
         
         # Ordenação padrão: por preço decrescente
-        return sorted(vehicles, key=lambda v: self.convert_price(v.get("preco")) or 0, reverse=True)
+        return (lambda r: r.preco or 0), True
     
-    def search_with_fallback(self, vehicles: List[Dict], filters: Dict[str, str],
+    def sort_vehicles(self, snapshot: InventorySnapshot, positions: Set[int], valormax: Optional[str], 
+                     anomax: Optional[str], kmmax: Optional[str], ccmax: Optional[str]) -> List[VehicleRecord]:
+        """Ordena veículos baseado nos filtros aplicados"""
+        # Parte da ordem original do estoque para manter o desempate estável
+        records = [snapshot.records[p] for p in sorted(positions)]
+        key, reverse = self.sort_key(valormax, anomax, kmmax, ccmax)
+        return sorted(records, key=key, reverse=reverse)
+    
+    def top_vehicles(self, snapshot: InventorySnapshot, positions: Set[int], limit: int,
+                     valormax: Optional[str], anomax: Optional[str], kmmax: Optional[str],
+                     ccmax: Optional[str]) -> List[VehicleRecord]:
+        """Seleciona os `limit` primeiros veículos da ordenação sem ordenar o conjunto inteiro
+        
+        Equivale a sort_vehicles(...)[:limit]: empates são resolvidos pela posição no estoque.
+        """
+        if len(positions) <= limit:
+            return self.sort_vehicles(snapshot, positions, valormax, anomax, kmmax, ccmax)
+        
+        records = snapshot.records
+        key, reverse = self.sort_key(valormax, anomax, kmmax, ccmax)
+        if reverse:
+            top_positions = heapq.nlargest(limit, positions, key=lambda p: (key(records[p]), -p))
+        else:
+            top_positions = heapq.nsmallest(limit, positions, key=lambda p: (key(records[p]), p))
+        return [records[p] for p in top_positions]
+    
+    def search_with_fallback(self, snapshot: InventorySnapshot, filters: Dict[str, str],
                             valormax: Optional[str], anomax: Optional[str], kmmax: Optional[str],
                             ccmax: Optional[str], excluded_ids: set) -> SearchResult:
         """Executa busca com fallback progressivo simplificado"""
         
+        # Conjuntos de cada filtro calculados uma única vez e reaproveitados pelo fallback
+        match_cache: Dict[Tuple, Set[int]] = {}
+        
         # Primeira tentativa: busca normal com expansão automática
-        filtered_vehicles = self.apply_filters(vehicles, filters)
-        filtered_vehicles = self.apply_range_filters(filtered_vehicles, valormax, anomax, kmmax, ccmax)
+        filtered_positions = self.apply_filters(snapshot, filters, match_cache)
+        filtered_positions = self.apply_range_filters(snapshot, filtered_positions, valormax, anomax, kmmax, ccmax, match_cache)
         
-        if excluded_ids:
-            filtered_vehicles = [
-                v for v in filtered_vehicles
-                if str(v.get("id")) not in excluded_ids
-            ]
+        filtered_positions = self.exclude_ids(snapshot, filtered_positions, excluded_ids)
         
-        if filtered_vehicles:
-            sorted_vehicles = self.sort_vehicles(filtered_vehicles, valormax, anomax, kmmax, ccmax)
+        if filtered_positions:
+            top_vehicles = self.top_vehicles(snapshot, filtered_positions, MAX_RESULTS, valormax, anomax, kmmax, ccmax)
             
             return SearchResult(
-                vehicles=sorted_vehicles[:6],  # Limita a 6 resultados
-                total_found=len(sorted_vehicles),
+                vehicles=top_vehicles,  # Limita a MAX_RESULTS resultados
+                total_found=len(filtered_positions),
                 fallback_info={},
                 removed_filters=[]
             )
@@ -479,7 +431,7 @@ class VehicleSearchEngine:
         
         if "modelo" in current_filters:
             model_value = current_filters["modelo"]
-            model_exists = self.model_exists_in_database(vehicles, model_value)
+            model_exists = self.model_exists_in_database(snapshot, model_value, match_cache)
             
             if not model_exists:
                 # Se não tem categoria, tenta mapear modelo→categoria
@@ -499,14 +451,13 @@ class VehicleSearchEngine:
                 
                 # Tenta busca sem o modelo inexistente
                 if current_filters:  # Se ainda sobrou algum filtro
-                    filtered_vehicles = self.apply_filters(vehicles, current_filters)
-                    filtered_vehicles = self.apply_range_filters(filtered_vehicles, valormax, anomax, kmmax, ccmax)
+                    filtered_positions = self.apply_filters(snapshot, current_filters, match_cache)
+                    filtered_positions = self.apply_range_filters(snapshot, filtered_positions, valormax, anomax, kmmax, ccmax, match_cache)
                     
-                    if excluded_ids:
-                        filtered_vehicles = [v for v in filtered_vehicles if str(v.get("id")) not in excluded_ids]
+                    filtered_positions = self.exclude_ids(snapshot, filtered_positions, excluded_ids)
                     
-                    if filtered_vehicles:
-                        sorted_vehicles = self.sort_vehicles(filtered_vehicles, valormax, anomax, kmmax, ccmax)
+                    if filtered_positions:
+                        top_vehicles = self.top_vehicles(snapshot, filtered_positions, MAX_RESULTS, valormax, anomax, kmmax, ccmax)
                         fallback_info = {
                             "fallback": {
                                 "removed_filters": removed_filters,
@@ -515,8 +466,8 @@ class VehicleSearchEngine:
                         }
                         
                         return SearchResult(
-                            vehicles=sorted_vehicles[:6],  # Limita a 6 resultados
-                            total_found=len(sorted_vehicles),
+                            vehicles=top_vehicles,  # Limita a MAX_RESULTS resultados
+                            total_found=len(filtered_positions),
                             fallback_info=fallback_info,
                             removed_filters=removed_filters
                         )
@@ -545,22 +496,18 @@ class VehicleSearchEngine:
                 continue
             
             # Tenta busca sem este parâmetro de range
-            filtered_vehicles = self.apply_filters(vehicles, current_filters)
-            filtered_vehicles = self.apply_range_filters(filtered_vehicles, current_valormax, current_anomax, current_kmmax, current_ccmax)
+            filtered_positions = self.apply_filters(snapshot, current_filters, match_cache)
+            filtered_positions = self.apply_range_filters(snapshot, filtered_positions, current_valormax, current_anomax, current_kmmax, current_ccmax, match_cache)
             
-            if excluded_ids:
-                filtered_vehicles = [
-                    v for v in filtered_vehicles
-                    if str(v.get("id")) not in excluded_ids
-                ]
+            filtered_positions = self.exclude_ids(snapshot, filtered_positions, excluded_ids)
             
-            if filtered_vehicles:
-                sorted_vehicles = self.sort_vehicles(filtered_vehicles, current_valormax, current_anomax, current_kmmax, current_ccmax)
+            if filtered_positions:
+                top_vehicles = self.top_vehicles(snapshot, filtered_positions, MAX_RESULTS, current_valormax, current_anomax, current_kmmax, current_ccmax)
                 fallback_info = {"fallback": {"removed_filters": removed_filters}}
                 
                 return SearchResult(
-                    vehicles=sorted_vehicles[:6],  # Limita a 6 resultados
-                    total_found=len(sorted_vehicles),
+                    vehicles=top_vehicles,  # Limita a MAX_RESULTS resultados
+                    total_found=len(filtered_positions),
                     fallback_info=fallback_info,
                     removed_filters=removed_filters
                 )
@@ -580,22 +527,18 @@ class VehicleSearchEngine:
             removed_filters.append(filter_to_remove)
             
             # Tenta busca sem o filtro removido
-            filtered_vehicles = self.apply_filters(vehicles, current_filters)
-            filtered_vehicles = self.apply_range_filters(filtered_vehicles, current_valormax, current_anomax, current_kmmax, current_ccmax)
+            filtered_positions = self.apply_filters(snapshot, current_filters, match_cache)
+            filtered_positions = self.apply_range_filters(snapshot, filtered_positions, current_valormax, current_anomax, current_kmmax, current_ccmax, match_cache)
             
-            if excluded_ids:
-                filtered_vehicles = [
-                    v for v in filtered_vehicles
-                    if str(v.get("id")) not in excluded_ids
-                ]
+            filtered_positions = self.exclude_ids(snapshot, filtered_positions, excluded_ids)
             
-            if filtered_vehicles:
-                sorted_vehicles = self.sort_vehicles(filtered_vehicles, current_valormax, current_anomax, current_kmmax, current_ccmax)
+            if filtered_positions:
+                top_vehicles = self.top_vehicles(snapshot, filtered_positions, MAX_RESULTS, current_valormax, current_anomax, current_kmmax, current_ccmax)
                 fallback_info = {"fallback": {"removed_filters": removed_filters}}
                 
                 return SearchResult(
-                    vehicles=sorted_vehicles[:6],  # Limita a 6 resultados
-                    total_found=len(sorted_vehicles),
+                    vehicles=top_vehicles,  # Limita a MAX_RESULTS resultados
+                    total_found=len(filtered_positions),
                     fallback_info=fallback_info,
                     removed_filters=removed_filters
                 )
@@ -611,6 +554,17 @@ class VehicleSearchEngine:
 # Instância global do motor de busca
 search_engine = VehicleSearchEngine()
 
+# Estado da atualização em segundo plano (usado pelo endpoint de prontidão)
+refresh_running = threading.Event()
+first_refresh_done = threading.Event()
+
+# Cache de respostas do /api/data (limpo a cada novo snapshot)
+response_cache = LRUCache(
+    maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL,
+    weigh=lambda entry: len(entry[0]),  # (corpo, status)
+    maxweight=RESPONSE_CACHE_MAX_BYTES, max_item_weight=RESPONSE_CACHE_MAX_ITEM_BYTES
+)
+
 def save_update_status(success: bool, message: str = "", vehicle_count: int = 0):
     """Salva o status da última atualização"""
     status = {
@@ -621,7 +575,7 @@ def save_update_status(success: bool, message: str = "", vehicle_count: int = 0)
     }
     
     try:
-        with open(STATUS_FILE, "w", encoding="utf-8") as f:
+        with atomic_open(STATUS_FILE) as f:
             json.dump(status, f, ensure_ascii=False, indent=2)
     except Exception as e:
         print(f"Erro ao salvar status: {e}")
@@ -644,19 +598,18 @@ def get_update_status() -> Dict:
 
 def wrapped_fetch_and_convert_xml():
     """Wrapper para fetch_and_convert_xml com logging de status"""
+    refresh_running.set()
     try:
         print("Iniciando atualização dos dados...")
-        fetch_and_convert_xml()
+        result = fetch_and_convert_xml()
         
-        # Verifica quantos veículos foram carregados
-        vehicle_count = 0
-        if os.path.exists("data.json"):
-            try:
-                with open("data.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    vehicle_count = len(data.get("veiculos", []))
-            except:
-                pass
+        # Instala o novo snapshot em memória (em caso de falha geral mantém o anterior)
+        if "_error" not in result:
+            save_snapshot(install_snapshot(result))
+            response_cache.clear()
+        
+        snapshot = get_snapshot()
+        vehicle_count = len(snapshot) if snapshot else 0
         
         save_update_status(True, "Dados atualizados com sucesso", vehicle_count)
         print(f"Atualização concluída: {vehicle_count} veículos carregados")
@@ -665,51 +618,65 @@ def wrapped_fetch_and_convert_xml():
         error_message = f"Erro na atualização: {str(e)}"
         save_update_status(False, error_message)
         print(error_message)
+    finally:
+        refresh_running.clear()
+        first_refresh_done.set()
 
 @app.on_event("startup")
 def schedule_tasks():
     """Agenda tarefas de atualização de dados"""
+    load_latest_snapshot()  # Disponibiliza o último estoque salvo
     scheduler = BackgroundScheduler(timezone="America/Sao_Paulo")
-    scheduler.add_job(wrapped_fetch_and_convert_xml, "cron", hour="0,12")
+    # Primeira execução imediata em segundo plano: a porta abre sem esperar os feeds
+    # (o mesmo job evita que a atualização agendada rode em paralelo com ela)
+    scheduler.add_job(
+        wrapped_fetch_and_convert_xml, "cron", hour="0,12",
+        next_run_time=datetime.now(timezone.utc)
+    )
     scheduler.start()
-    wrapped_fetch_and_convert_xml()  # Executa uma vez na inicialização
 
-@app.get("/api/data")
-def get_data(request: Request):
-    """Endpoint principal para busca de veículos"""
-    
-    # Verifica se o arquivo de dados existe
-    if not os.path.exists("data.json"):
-        return JSONResponse(
-            content={
-                "error": "Nenhum dado disponível",
-                "resultados": [],
-                "total_encontrado": 0
-            },
-            status_code=404
-        )
-    
-    # Carrega os dados
-    try:
-        with open("data.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
-        vehicles = data.get("veiculos", [])
-        if not isinstance(vehicles, list):
-            raise ValueError("Formato inválido: 'veiculos' deve ser uma lista")
-            
-    except (json.JSONDecodeError, ValueError, KeyError) as e:
-        return JSONResponse(
-            content={
-                "error": f"Erro ao carregar dados: {str(e)}",
-                "resultados": [],
-                "total_encontrado": 0
-            },
-            status_code=500
+@dataclass
+class DataQuery:
+    """Parâmetros já extraídos de uma requisição ao /api/data"""
+    filters: Dict[str, str]
+    valormax: Optional[str]
+    anomax: Optional[str]
+    kmmax: Optional[str]
+    ccmax: Optional[str]
+    simples: bool
+    excluded_ids: FrozenSet[str]
+    id_param: Optional[str]
+    limit: Optional[int] = None                 # paginação da listagem completa
+    offset: int = 0
+    campos: Optional[Tuple[str, ...]] = None    # projeção: campos incluídos em cada veículo
+    streaming: Optional[str] = None             # "json" ou "ndjson" (respostas em streaming não usam o cache)
+    
+    def cache_key(self) -> Tuple:
+        """Chave canônica: mesma chave para consultas equivalentes"""
+        normalized_filters = []
+        for key, value in sorted(self.filters.items()):
+            if key in search_engine.exact_fields:
+                # Filtros exatos: conjunto de valores normalizados (ordem e caixa irrelevantes)
+                value = tuple(sorted({
+                    search_engine.normalize_text(v) for v in search_engine.split_multi_value(value)
+                }))
+            elif key in ("cor", "opcionais"):
+                # Filtros fuzzy: conjunto de palavras normalizadas
+                value = tuple(sorted(set(
+                    search_engine.normalize_query_words(search_engine.split_query_words(value))
+                )))
+            # 'modelo' mantém o valor original (aparece em removed_filters)
+            normalized_filters.append((key, value))
+        
+        return (
+            tuple(normalized_filters), self.valormax, self.anomax, self.kmmax, self.ccmax,
+            self.simples, tuple(sorted(self.excluded_ids)), self.id_param,
+            self.limit, self.offset, self.campos
         )
-    
-    # Extrai parâmetros da query
-    query_params = dict(request.query_params)
+
+def parse_data_query(query_params: Dict[str, str]) -> DataQuery:
+    """Extrai filtros e parâmetros especiais da query"""
+    query_params = dict(query_params)
     
     # Parâmetros especiais
     valormax = query_params.pop("ValorMax", None)
@@ -722,6 +689,18 @@ def get_data(request: Request):
     # Parâmetro especial para busca por ID
     id_param = query_params.pop("id", None)
     
+    # Paginação e projeção de campos
+    limit = parse_non_negative_int(query_params.pop("limit", None))
+    # limit=0 é ignorado como os valores inválidos: a página vazia nunca avançaria o proximo_offset
+    limit = min(limit, MAX_PAGE_LIMIT) if limit else None
+    offset = parse_non_negative_int(query_params.pop("offset", None)) or 0
+    campos = query_params.pop("campos", None)
+    
+    # Streaming: formato=ndjson (um veículo por linha) ou stream=1 (mesmo JSON, enviado em partes)
+    formato = query_params.pop("formato", None)
+    stream = query_params.pop("stream", None)
+    streaming = "ndjson" if formato == "ndjson" else ("json" if stream == "1" else None)
+    
     # Filtros principais
     filters = {
         "tipo": query_params.get("tipo"),
@@ -737,82 +716,91 @@ def get_data(request: Request):
     # Remove filtros vazios
     filters = {k: v for k, v in filters.items() if v}
     
+    # Processa IDs a excluir
+    excluded_ids = frozenset()
+    if excluir:
+        excluded_ids = frozenset(e.strip() for e in excluir.split(",") if e.strip())
+    
+    return DataQuery(
+        filters=filters,
+        valormax=valormax or None,
+        anomax=anomax or None,
+        kmmax=kmmax or None,
+        ccmax=ccmax or None,
+        simples=simples == "1",
+        excluded_ids=excluded_ids,
+        id_param=id_param or None,
+        limit=limit,
+        offset=offset,
+        campos=tuple(dict.fromkeys(c.strip() for c in campos.split(",") if c.strip())) if campos else None,
+        streaming=streaming
+    )
+
+def parse_non_negative_int(value: Optional[str]) -> Optional[int]:
+    """Converte parâmetro inteiro da query (valores inválidos ou negativos são ignorados)"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number >= 0 else None
+
+def build_data_response(snapshot: InventorySnapshot, query: DataQuery,
+                        lazy: bool = False) -> Tuple[Dict[str, Any], int]:
+    """Executa a consulta sobre o snapshot e monta a resposta ('resultados' traz os registros)
+    
+    Com lazy=True a listagem completa traz um iterador em 'resultados' (usado no streaming).
+    """
+    filters = query.filters
+    valormax, anomax, kmmax, ccmax = query.valormax, query.anomax, query.kmmax, query.ccmax
+    excluded_ids = query.excluded_ids
+    id_param = query.id_param
+    
     # BUSCA POR ID ESPECÍFICO - tem prioridade sobre tudo
     if id_param:
-        vehicle_found = None
-        for vehicle in vehicles:
-            if str(vehicle.get("id")) == str(id_param):
-                vehicle_found = vehicle
-                break
+        vehicle_found = snapshot.find_by_id(id_param)
         
         if vehicle_found:
-            # Aplica modo simples se solicitado
-            if simples == "1":
-                fotos = vehicle_found.get("fotos")
-                if isinstance(fotos, list):
-                    vehicle_found["fotos"] = fotos[:1] if fotos else []
-            
-            return JSONResponse(content={
+            return {
                 "resultados": [vehicle_found],
                 "total_encontrado": 1,
                 "info": f"Veículo encontrado por ID: {id_param}"
-            })
+            }, 200
         else:
-            return JSONResponse(content={
+            return {
                 "resultados": [],
                 "total_encontrado": 0,
                 "error": f"Veículo com ID {id_param} não encontrado"
-            })
+            }, 200
     
     # Verifica se há filtros de busca reais (exclui parâmetros especiais)
     has_search_filters = bool(filters) or valormax or anomax or kmmax or ccmax
     
-    # Processa IDs a excluir
-    excluded_ids = set()
-    if excluir:
-        excluded_ids = set(e.strip() for e in excluir.split(",") if e.strip())
-    
-    # Se não há filtros de busca, retorna todo o estoque
+    # Se não há filtros de busca, retorna todo o estoque (ou a página pedida)
     if not has_search_filters:
-        all_vehicles = list(vehicles)
-        
-        # Remove IDs excluídos se especificado
-        if excluded_ids:
-            all_vehicles = [
-                v for v in all_vehicles
-                if str(v.get("id")) not in excluded_ids
-            ]
-        
-        # Ordena por preço decrescente (padrão)
-        sorted_vehicles = sorted(all_vehicles, key=lambda v: search_engine.convert_price(v.get("preco")) or 0, reverse=True)
-        
-        # Aplica modo simples se solicitado
-        if simples == "1":
-            for vehicle in sorted_vehicles:
-                # Mantém apenas a primeira foto
-                fotos = vehicle.get("fotos")
-                if isinstance(fotos, list):
-                    vehicle["fotos"] = fotos[:1] if fotos else []
-        
-        return JSONResponse(content={
-            "resultados": sorted_vehicles,  # AQUI ESTAVA O PROBLEMA - retorna todos, não limita a 6
-            "total_encontrado": len(sorted_vehicles),
+        # Offsets além do estoque viram página vazia (islice não aceita valores acima de sys.maxsize)
+        offset = min(query.offset, len(snapshot))
+        page = iter_stock_page(snapshot, excluded_ids, offset, query.limit)
+        total = len(snapshot) - (len(snapshot.positions_for_ids(excluded_ids)) if excluded_ids else 0)
+        
+        response_data = {
+            "resultados": page if lazy else list(page),
+            "total_encontrado": total,
             "info": "Exibindo todo o estoque disponível"
-        })
+        }
+        if query.limit is not None or query.offset:
+            next_offset = offset + query.limit if query.limit is not None else total
+            response_data["paginacao"] = {
+                "offset": offset,
+                "limit": query.limit,
+                "proximo_offset": next_offset if next_offset < total else None
+            }
+        return response_data, 200
     
     # Executa a busca com fallback
     result = search_engine.search_with_fallback(
-        vehicles, filters, valormax, anomax, kmmax, ccmax, excluded_ids
+        snapshot, filters, valormax, anomax, kmmax, ccmax, excluded_ids
     )
     
-    # Aplica modo simples se solicitado
-    if simples == "1" and result.vehicles:
-        for vehicle in result.vehicles:
-            # Mantém apenas a primeira foto
-            fotos = vehicle.get("fotos")
-            if isinstance(fotos, list):
-                vehicle["fotos"] = fotos[:1] if fotos else []
-    
     # Monta resposta
     response_data = {
         "resultados": result.vehicles,
@@ -830,19 +818,127 @@ def get_data(request: Request):
             "e também não encontramos opções próximas."
         )
     
-    return JSONResponse(content=response_data)
+    return response_data, 200
+
+def iter_stock_page(snapshot: InventorySnapshot, excluded_ids: FrozenSet[str], offset: int,
+                    limit: Optional[int]) -> Iterator[VehicleRecord]:
+    """Página da listagem completa na ordem de preço pré-calculada no snapshot"""
+    end = offset + limit if limit is not None else None
+    if not excluded_ids:
+        return (snapshot.records[p] for p in snapshot.price_order[offset:end])
+    
+    # Com exclusões a página é percorrida pulando as posições excluídas
+    excluded_positions = snapshot.positions_for_ids(excluded_ids)
+    remaining = (p for p in snapshot.price_order if p not in excluded_positions)
+    return (snapshot.records[p] for p in islice(remaining, offset, end))
+
+def build_response_body(snapshot: InventorySnapshot, query: DataQuery) -> Tuple[bytes, int]:
+    """Executa a consulta e retorna o corpo já serializado"""
+    content, status_code = build_data_response(snapshot, query)
+    return render_data_response(content, query.simples, query.campos), status_code
+
+def render_data_response(content: Dict[str, Any], simples: bool,
+                         campos: Optional[Tuple[str, ...]] = None) -> bytes:
+    """Monta o corpo JSON a partir dos fragmentos pré-serializados de cada veículo"""
+    # Modo simples: usa a variante serializada só com a primeira foto; campos= projeta cada veículo
+    fragments = [r.project(campos, simples=simples) for r in content["resultados"]]
+    rest = dumps_json({k: v for k, v in content.items() if k != "resultados"})
+    
+    body = b'{"resultados":[' + b",".join(fragments) + b"]"
+    if rest != b"{}":
+        body += b"," + rest[1:]
+    else:
+        body += b"}"
+    return body
+
+def iter_streamed_body(content: Dict[str, Any], query: DataQuery) -> Iterator[bytes]:
+    """Corpo da resposta em partes: o JSON de render_data_response ou NDJSON (um veículo por linha)"""
+    records = content["resultados"]
+    batch: List[bytes] = []
+    first = True
+    
+    if query.streaming == "json":
+        yield b'{"resultados":['
+    for record in records:
+        batch.append(record.project(query.campos, simples=query.simples))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield join_stream_batch(batch, query.streaming, first)
+            batch, first = [], False
+    if batch:
+        yield join_stream_batch(batch, query.streaming, first)
+    
+    if query.streaming == "json":
+        rest = dumps_json({k: v for k, v in content.items() if k != "resultados"})
+        yield b"]," + rest[1:] if rest != b"{}" else b"]}"
+
+def join_stream_batch(batch: List[bytes], streaming: str, first: bool) -> bytes:
+    """Junta um lote de fragmentos no formato do streaming"""
+    if streaming == "ndjson":
+        return b"\n".join(batch) + b"\n"
+    return (b"" if first else b",") + b",".join(batch)
+
+def stream_data_response(snapshot: InventorySnapshot, query: DataQuery) -> StreamingResponse:
+    """Resposta em streaming: os veículos são serializados à medida que são enviados"""
+    content, status_code = build_data_response(snapshot, query, lazy=True)
+    if query.streaming == "ndjson":
+        return StreamingResponse(
+            iter_streamed_body(content, query), status_code=status_code, media_type="application/x-ndjson",
+            headers={"X-Total-Count": str(content["total_encontrado"])}
+        )
+    return StreamingResponse(iter_streamed_body(content, query), status_code=status_code,
+                             media_type="application/json")
+
+@app.get("/api/data")
+async def get_data(request: Request):
+    """Endpoint principal para busca de veículos"""
+    
+    # Usa o snapshot em memória (nenhuma leitura de disco por requisição)
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return JSONResponse(
+            content={
+                "error": "Nenhum dado disponível",
+                "resultados": [],
+                "total_encontrado": 0
+            },
+            status_code=404
+        )
+    
+    query = parse_data_query(request.query_params)
+    if query.streaming:
+        return await run_in_threadpool(stream_data_response, snapshot, query)
+    
+    # Consultas repetidas são servidas do cache direto no event loop (a versão do
+    # snapshot faz parte da chave); só a busca em si ocupa uma thread do pool
+    cache_key = (snapshot.version, query.cache_key())
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        cached = await run_in_threadpool(
+            response_cache.get_or_compute, cache_key, lambda: build_response_body(snapshot, query)
+        )
+    body, status_code = cached
+    return Response(content=body, status_code=status_code, media_type="application/json")
 
 @app.get("/api/health")
-def health_check():
+async def health_check():
     """Endpoint de verificação de saúde"""
     return {"status": "healthy", "timestamp": "2025-07-13"}
 
-@app.get("/api/status")
-def get_status():
-    """Endpoint para verificar status da última atualização dos dados"""
-    status = get_update_status()
-    
-    # Informações adicionais sobre os arquivos
+@app.get("/api/ready")
+async def readiness_check():
+    """Endpoint de prontidão: pronto quando há um snapshot do estoque para servir"""
+    snapshot = get_snapshot()
+    content = {
+        "ready": snapshot is not None,
+        "snapshot_version": snapshot.version if snapshot else None,
+        "vehicle_count": len(snapshot) if snapshot else 0,
+        "first_refresh_done": first_refresh_done.is_set(),
+        "refreshing": refresh_running.is_set(),
+    }
+    return JSONResponse(content=content, status_code=200 if snapshot is not None else 503)
+
+def get_data_file_info() -> Dict[str, Any]:
+    """Informações sobre o arquivo data.json (leitura de disco)"""
     data_file_exists = os.path.exists("data.json")
     data_file_size = 0
     data_file_modified = None
@@ -855,13 +951,27 @@ def get_status():
         except:
             pass
     
+    return {
+        "exists": data_file_exists,
+        "size_bytes": data_file_size,
+        "modified_at": data_file_modified
+    }
+
+@app.get("/api/status")
+async def get_status():
+    """Endpoint para verificar status da última atualização dos dados"""
+    # Leituras de disco rodam fora do event loop
+    status = await run_in_threadpool(get_update_status)
+    data_file = await run_in_threadpool(get_data_file_info)
+    snapshot = get_snapshot()
+    
     return {
         "last_update": status,
-        "data_file": {
-            "exists": data_file_exists,
-            "size_bytes": data_file_size,
-            "modified_at": data_file_modified
-        },
+        "data_file": data_file,
+        "fuzzy_memo": snapshot.fuzzy_memo.stats() if snapshot else None,
+        "snapshot_version": snapshot.version if snapshot else None,
+        "last_diff": snapshot.diff if snapshot else None,
+        "response_cache": response_cache.stats(),
         "current_time": datetime.now().isoformat()
     }
 
@@ -0,0 +1,87 @@
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class KeywordMatcher:
+    """Autômato de Aho–Corasick sobre as chaves (já normalizadas) de uma tabela de mapeamento
+
+    Compilado uma única vez: a busca percorre o texto uma vez só,
+    independentemente do tamanho da tabela. Entre as chaves contidas no texto
+    vence a mais longa; em empate, a que aparece primeiro no texto. Chaves que
+    ficam iguais após a normalização mantêm o valor da primeira ocorrência.
+    """
+
+    def __init__(self, mapping: Dict[str, Any], normalize: Callable[[str], str] = lambda key: key):
+        self.values: Dict[str, Any] = {}
+        for key, value in mapping.items():
+            normalized = normalize(key)
+            if normalized and normalized not in self.values:
+                self.values[normalized] = value
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._longest: List[Optional[str]] = [None]  # chave mais longa terminando no nó
+        for key in self.values:
+            self._insert(key)
+        self._build_failure_links()
+
+        # Substrings das chaves -> primeira chave (na ordem da tabela) que as contém
+        self._containing: Dict[str, str] = {}
+        for key in self.values:
+            for start in range(len(key)):
+                for end in range(start + 1, len(key) + 1):
+                    self._containing.setdefault(key[start:end], key)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _insert(self, key: str) -> None:
+        node = 0
+        for char in key:
+            following = self._goto[node].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[node][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._longest.append(None)
+            node = following
+        self._longest[node] = key
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, following in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[following] = target if target != following else 0
+                # A chave do próprio nó é sempre mais longa que as dos sufixos
+                if self._longest[following] is None:
+                    self._longest[following] = self._longest[self._fail[following]]
+                queue.append(following)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """(posição final, chave mais longa terminando ali) para cada ponto do texto com match"""
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            if self._longest[node] is not None:
+                yield position, self._longest[node]
+
+    def longest_contained(self, text: str) -> Optional[str]:
+        """Chave mais longa contida no texto (a primeira no texto em caso de empate)"""
+        best: Optional[str] = None
+        for _, key in self.iter_matches(text):
+            # Matches chegam em ordem de posição final: em empate mantém o primeiro
+            if best is None or len(key) > len(best):
+                best = key
+        return best
+
+    def first_containing(self, text: str) -> Optional[str]:
+        """Primeira chave da tabela que contém o texto inteiro"""
+        return self._containing.get(text)
@@ -0,0 +1,310 @@
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from itertools import compress
+from typing import Any, Dict, List, Optional, Tuple
+
+from inventory import (
+    EXACT_FIELDS,
+    FUZZY_FIELDS,
+    JSON_FILE,
+    InventorySnapshot,
+    NumericColumn,
+    VehicleRecord,
+    activate_snapshot,
+    advance_snapshot_version,
+    get_snapshot,
+    load_snapshot_from_disk,
+)
+from storage import atomic_open
+
+# Diretório dos snapshots binários versionados (o data.json continua como exportação de depuração)
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+
+# Quantidade de versões mantidas em disco
+SNAPSHOT_RETENTION = int(os.environ.get("SNAPSHOT_RETENTION", "5"))
+
+_SNAPSHOT_NAME = re.compile(r"inventory-(\d+)\.snapshot")
+
+# Identificação e versão do formato
+SNAPSHOT_MAGIC = b"RVSNAP\x00\x02"
+
+# Campos de texto normalizados guardados como índices da tabela de strings
+STRING_FIELDS = EXACT_FIELDS + FUZZY_FIELDS
+
+# Colunas numéricas: atributo do VehicleRecord -> typecode do array
+NUMERIC_COLUMNS = {"preco": "d", "ano": "q", "km": "q", "cilindrada": "d"}
+
+# Alinhamento das seções dentro do arquivo
+_ALIGNMENT = 8
+
+# =================== FORMATO =======================
+#
+# MAGIC | tamanho do cabeçalho (uint32 LE) | cabeçalho JSON | seções alinhadas
+#
+# O cabeçalho descreve cada seção como [offset, typecode, quantidade]:
+#   strings:offsets / strings:blob   tabela de strings internadas (UTF-8)
+#   str:id / str:<campo>             índice na tabela por veículo (str(id) e
+#                                    campos normalizados)
+#   num:<atributo> / has:<atributo>  coluna numérica e máscara de presença
+#   sorted:<atributo> / rank:<atributo>
+#                                    valores da coluna já ordenados e suas posições
+#   order:listagem                   posições na ordem da listagem completa
+#   json:spans / json:simple / json:blob
+#                                    fragmentos JSON pré-serializados (início e
+#                                    fim de cada veículo); o modo simples
+#                                    reaproveita o trecho do completo quando o
+#                                    conteúdo é o mesmo
+#
+# Na leitura as seções numéricas e os fragmentos JSON são usados direto do mmap
+# (memoryview), sem cópia; o veículo completo só é decodificado do fragmento
+# quando pedido.
+
+def _intern_strings(records: Tuple[VehicleRecord, ...]) -> Tuple[List[str], Dict[str, array]]:
+    """Tabela de strings distintas e colunas de índices por campo"""
+    table: Dict[str, int] = {}
+    columns = {"id": array("I", (table.setdefault(r.id, len(table)) for r in records))}
+    for field in STRING_FIELDS:
+        columns[field] = array("I", (table.setdefault(r.normalized[field], len(table)) for r in records))
+    return list(table), columns
+
+
+def _blob_with_offsets(chunks: List[bytes]) -> Tuple[array, bytes]:
+    """Concatena os trechos e retorna os offsets (n + 1) de cada um"""
+    offsets = array("Q", [0])
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        offsets.append(total)
+    return offsets, b"".join(chunks)
+
+
+def encode_snapshot(snapshot: InventorySnapshot) -> bytes:
+    """Serializa o snapshot no formato binário colunar"""
+    records = snapshot.records
+    sections: List[Tuple[str, str, bytes, int]] = []
+
+    def add(name: str, values: Any, typecode: str = "B") -> None:
+        data = values.tobytes() if isinstance(values, (array, memoryview)) else values
+        sections.append((name, typecode, data, len(values)))
+
+    strings, string_columns = _intern_strings(records)
+    string_offsets, string_blob = _blob_with_offsets([s.encode("utf-8") for s in strings])
+    add("strings:offsets", string_offsets, "Q")
+    add("strings:blob", string_blob)
+    for field, column in string_columns.items():
+        add(f"str:{field}", column, "I")
+
+    for attribute, typecode in NUMERIC_COLUMNS.items():
+        values = [getattr(r, attribute) for r in records]
+        add(f"num:{attribute}", array(typecode, (0 if v is None else v for v in values)), typecode)
+        add(f"has:{attribute}", bytes(v is not None for v in values))
+        column = snapshot.columns[attribute]
+        add(f"sorted:{attribute}", array("d", column.values), "d")
+        add(f"rank:{attribute}", array("q", column.positions), "q")
+    add("order:listagem", array("q", snapshot.price_order), "q")
+
+    chunks: List[bytes] = []
+    json_spans = array("Q")
+    simple_spans = array("Q")
+    position = 0
+    for record in records:
+        chunks.append(record.json)
+        json_spans.extend((position, position + len(record.json)))
+        position += len(record.json)
+        if record.json_simple is not record.json:
+            chunks.append(record.json_simple)
+            simple_spans.extend((position, position + len(record.json_simple)))
+            position += len(record.json_simple)
+        else:
+            simple_spans.extend(json_spans[-2:])
+    add("json:spans", json_spans, "Q")
+    add("json:simple", simple_spans, "Q")
+    add("json:blob", b"".join(chunks))
+
+    layout: Dict[str, List[Any]] = {}
+    position = 0
+    for name, typecode, data, count in sections:
+        layout[name] = [position, typecode, count]
+        position += len(data) + (-len(data) % _ALIGNMENT)
+
+    header = json.dumps({
+        "version": snapshot.version,
+        "count": len(records),
+        "updated_at": snapshot.updated_at,
+        "byteorder": sys.byteorder,
+        "sections": layout,
+    }).encode("utf-8")
+    prefix = SNAPSHOT_MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\x00" * (-len(prefix) % _ALIGNMENT)
+
+    parts = [prefix]
+    for _, _, data, _ in sections:
+        parts.append(data)
+        parts.append(b"\x00" * (-len(data) % _ALIGNMENT))
+    return b"".join(parts)
+
+
+def decode_snapshot(buffer: Any, previous: Optional[InventorySnapshot] = None) -> InventorySnapshot:
+    """Reconstrói o snapshot a partir do formato binário sem normalizar os veículos de novo
+    
+    As colunas numéricas, as ordenações e os fragmentos JSON ficam como memoryviews
+    sobre `buffer`, que precisa continuar aberto enquanto o snapshot estiver em uso.
+    """
+    view = memoryview(buffer).toreadonly()
+    if bytes(view[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+        raise ValueError("Arquivo não é um snapshot do estoque")
+    start = len(SNAPSHOT_MAGIC)
+    (header_size,) = struct.unpack("<I", view[start:start + 4])
+    header = json.loads(bytes(view[start + 4:start + 4 + header_size]))
+    if header["byteorder"] != sys.byteorder:
+        raise ValueError("Snapshot gravado em outra ordem de bytes")
+    base = start + 4 + header_size
+    base += -base % _ALIGNMENT
+
+    def section(name: str) -> memoryview:
+        offset, typecode, count = header["sections"][name]
+        begin = base + offset
+        end = begin + count * array(typecode).itemsize
+        if end > len(view):
+            raise ValueError(f"Snapshot truncado na seção {name}")
+        return view[begin:end].cast(typecode)
+
+    count = header["count"]
+    string_offsets = section("strings:offsets")
+    string_blob = section("strings:blob")
+    strings = [
+        str(string_blob[string_offsets[i]:string_offsets[i + 1]], "utf-8")
+        for i in range(len(string_offsets) - 1)
+    ]
+    string_words = [tuple(s.split()) for s in strings]
+    ids = section("str:id")
+    string_columns = [(field, section(f"str:{field}")) for field in STRING_FIELDS]
+    fuzzy_columns = [(field, column) for field, column in string_columns if field in FUZZY_FIELDS]
+
+    columns: Dict[str, NumericColumn] = {}
+    for attribute in NUMERIC_COLUMNS:
+        columns[attribute] = NumericColumn(
+            section(f"num:{attribute}"),
+            frozenset(compress(range(count), section(f"has:{attribute}"))),
+            section(f"sorted:{attribute}"),
+            section(f"rank:{attribute}"),
+        )
+    preco, ano, km, cilindrada = (
+        (columns[attribute].by_position, columns[attribute].present) for attribute in NUMERIC_COLUMNS
+    )
+
+    json_spans = section("json:spans")
+    simple_spans = section("json:simple")
+    blob = section("json:blob")
+
+    records = []
+    for i in range(count):
+        json_start, json_end = json_spans[2 * i], json_spans[2 * i + 1]
+        simple_start, simple_end = simple_spans[2 * i], simple_spans[2 * i + 1]
+        # Fragmentos ficam como fatias do mmap: hasheáveis e aceitos por bytes.join, sem cópia
+        encoded = blob[json_start:json_end]
+        if simple_start == json_start:
+            encoded_simple = encoded
+        else:
+            encoded_simple = blob[simple_start:simple_end]
+        normalized = {field: strings[column[i]] for field, column in string_columns}
+        records.append(VehicleRecord(
+            id=strings[ids[i]],
+            preco=preco[0][i] if i in preco[1] else None,
+            ano=ano[0][i] if i in ano[1] else None,
+            km=km[0][i] if i in km[1] else None,
+            cilindrada=cilindrada[0][i] if i in cilindrada[1] else None,
+            normalized=normalized,
+            words={field: string_words[column[i]] for field, column in fuzzy_columns},
+            json=encoded,
+            json_simple=encoded_simple,
+        ))
+
+    return InventorySnapshot(
+        (), header.get("updated_at"), previous=previous, records=tuple(records),
+        version=header.get("version"), columns=columns, price_order=section("order:listagem"),
+    )
+
+# =================== LEITURA E GRAVAÇÃO =======================
+
+def snapshot_path(version: int, directory: str = SNAPSHOT_DIR) -> str:
+    """Caminho do arquivo de uma versão do snapshot"""
+    return os.path.join(directory, f"inventory-{version:08d}.snapshot")
+
+
+def list_snapshot_versions(directory: str = SNAPSHOT_DIR) -> List[int]:
+    """Versões gravadas em disco, da mais recente para a mais antiga"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    versions = []
+    for name in names:
+        match = _SNAPSHOT_NAME.fullmatch(name)
+        if match:
+            versions.append(int(match.group(1)))
+    return sorted(versions, reverse=True)
+
+
+def prune_snapshots(directory: str = SNAPSHOT_DIR, keep: int = SNAPSHOT_RETENTION) -> None:
+    """Remove as versões além das `keep` mais recentes"""
+    for version in list_snapshot_versions(directory)[max(keep, 1):]:
+        try:
+            os.remove(snapshot_path(version, directory))
+        except OSError as e:
+            print(f"[AVISO] Não foi possível remover snapshot v{version}: {e}")
+
+
+def save_snapshot(snapshot: InventorySnapshot, directory: str = SNAPSHOT_DIR) -> bool:
+    """Grava o snapshot binário da versão atual; falhas não interrompem a atualização"""
+    path = snapshot_path(snapshot.version, directory)
+    try:
+        data = encode_snapshot(snapshot)
+        os.makedirs(directory, exist_ok=True)
+        with atomic_open(path, "wb") as f:
+            f.write(data)
+        print(f"[OK] Snapshot v{snapshot.version} salvo em {path}: {len(snapshot)} veículos, {len(data)} bytes")
+    except (OSError, OverflowError, TypeError, ValueError) as e:
+        print(f"[ERRO] Erro ao salvar snapshot binário em {path}: {e}")
+        return False
+
+    prune_snapshots(directory)
+    return True
+
+
+def read_snapshot(path: str) -> InventorySnapshot:
+    """Lê o snapshot binário via mmap (o mapeamento vive enquanto o snapshot for referenciado)"""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return decode_snapshot(mapped, previous=get_snapshot())
+
+
+def load_latest_snapshot(directory: str = SNAPSHOT_DIR, json_path: str = JSON_FILE) -> Optional[InventorySnapshot]:
+    """Carrega a versão mais recente legível do snapshot binário
+    
+    Versões corrompidas são ignoradas em favor da anterior. Usa o data.json se
+    não houver snapshot binário ou se ele for mais antigo que o JSON.
+    """
+    versions = list_snapshot_versions(directory)
+    if versions:
+        # Novas versões continuam a numeração do disco mesmo se o binário for descartado
+        advance_snapshot_version(versions[0])
+
+    for version in versions:
+        path = snapshot_path(version, directory)
+        try:
+            if os.path.exists(json_path) and os.path.getmtime(json_path) > os.path.getmtime(path):
+                print(f"[AVISO] Snapshot binário {path} mais antigo que {json_path}, usando JSON")
+                break
+            snapshot = activate_snapshot(read_snapshot(path))
+            print(f"[OK] Snapshot v{version} carregado de {path}: {len(snapshot)} veículos")
+            return snapshot
+        except (OSError, ValueError, KeyError, struct.error, UnicodeDecodeError) as e:
+            print(f"[ERRO] Erro ao carregar snapshot binário de {path}: {e}")
+
+    return load_snapshot_from_disk(json_path)
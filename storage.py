@@ -0,0 +1,65 @@
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+
+def _current_umask() -> int:
+    """Umask do processo (os.umask só permite ler trocando o valor; feito uma vez na importação)"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Permissões de um arquivo novo criado com open() (mkstemp sempre usa 0600)
+_DEFAULT_FILE_MODE = 0o666 & ~_current_umask()
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = "w", encoding: str = "utf-8") -> Iterator[IO]:
+    """Abre um arquivo temporário que substitui `path` atomicamente ao final do bloco
+
+    O conteúdo é gravado ao lado do destino, sincronizado com fsync e renomeado
+    com os.replace: leitores veem o arquivo anterior ou o novo, nunca um arquivo
+    truncado. Se o bloco falhar, o destino fica intacto. O arquivo final mantém
+    as permissões do anterior (ou as padrão da umask, se for novo).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, _target_mode(path))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
+
+
+def _target_mode(path: str) -> int:
+    """Permissões do arquivo existente em `path` ou as padrão para um arquivo novo"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return _DEFAULT_FILE_MODE
+
+
+def _fsync_directory(directory: str) -> None:
+    """Garante que a renomeação foi persistida (ignorado onde não é suportado)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
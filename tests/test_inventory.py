@@ -0,0 +1,12 @@
+from inventory import VehicleRecord, loads_json
+
+
+def test_project_decodes_without_keeping_the_vehicle():
+    record = VehicleRecord.from_vehicle({"id": 1, "marca": "Fiat", "fotos": ["a.jpg", "b.jpg"]})
+
+    assert loads_json(record.project(("marca", "fotos", "cor"))) == {"marca": "Fiat", "fotos": ["a.jpg", "b.jpg"]}
+    assert loads_json(record.project(("fotos",), simples=True)) == {"fotos": ["a.jpg"]}
+    assert record.data["fotos"] == ("a.jpg", "b.jpg")
+    # Registros compartilhados não guardam o veículo decodificado
+    assert not hasattr(record, "__dict__")
+    assert "_data" not in VehicleRecord.__slots__
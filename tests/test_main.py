@@ -0,0 +1,31 @@
+from inventory import InventorySnapshot
+from main import build_data_response, parse_data_query
+
+
+def make_snapshot():
+    return InventorySnapshot([
+        {"id": "1", "marca": "Fiat", "preco": "50000"},
+        {"id": "2", "marca": "Honda", "preco": "80000"},
+        {"id": "3", "marca": "Ford", "preco": "30000"},
+    ])
+
+
+def test_offset_beyond_stock_returns_empty_page_with_exclusions():
+    snapshot = make_snapshot()
+    query = parse_data_query({"offset": "99999999999999999999", "excluir": "1"})
+
+    content, status_code = build_data_response(snapshot, query)
+
+    assert status_code == 200
+    assert content["resultados"] == []
+    assert content["total_encontrado"] == 2
+    assert content["paginacao"] == {"offset": 3, "limit": None, "proximo_offset": None}
+
+
+def test_offset_beyond_stock_in_lazy_mode():
+    snapshot = make_snapshot()
+    query = parse_data_query({"offset": "99999999999999999999", "excluir": "2", "stream": "1"})
+
+    content, _ = build_data_response(snapshot, query, lazy=True)
+
+    assert list(content["resultados"]) == []
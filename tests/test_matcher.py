@@ -0,0 +1,51 @@
+from matcher import KeywordMatcher
+from xml_fetcher import CILINDRADA_MATCHER, inferir_cilindrada, normalizar_modelo
+
+
+def brute_force_longest(keys, text):
+    best = None
+    for end in range(len(text)):
+        for key in keys:
+            if text.endswith(key, 0, end + 1) and (best is None or len(key) > len(best[1])):
+                best = (end, key)
+    return best[1] if best else None
+
+
+def test_longest_match_wins():
+    # "dr160" também contém "r1" (1000)
+    assert inferir_cilindrada("DR 160") == 160
+    assert inferir_cilindrada("Honda CG 160 Titan S") == 160
+    assert inferir_cilindrada("Yamaha R1") == 1000
+    assert inferir_cilindrada("Fusca") is None
+
+
+def test_ties_keep_the_first_match_in_the_text():
+    matcher = KeywordMatcher({"abc": 1, "xyz": 2})
+
+    assert matcher.longest_contained("xyz abc") == "xyz"
+    assert matcher.longest_contained("abc xyz") == "abc"
+
+
+def test_agrees_with_brute_force_search():
+    keys = list(CILINDRADA_MATCHER.values)
+    models = [
+        "DR 160 S", "CB 500F", "XRE 300 Sahara Rally", "MT-09 Tracer", "Biz 125 ES", "Z900RS",
+        "Ninja ZX-10R", "cforce 1000 overland", "Street Triple RS", "Gol 1.0", "",
+    ]
+    for model in models:
+        text = normalizar_modelo(model)
+        assert CILINDRADA_MATCHER.longest_contained(text) == brute_force_longest(keys, text), model
+
+
+def test_normalized_duplicates_keep_the_first_value():
+    matcher = KeywordMatcher({"MT-03": 300, "mt03": 320}, normalizar_modelo)
+
+    assert matcher.values == {"mt03": 300}
+
+
+def test_first_containing():
+    matcher = KeywordMatcher({"grand siena": "Sedan", "siena": "Sedan", "santa fe": "SUV"})
+
+    assert matcher.first_containing("sien") == "grand siena"
+    assert matcher.first_containing("fe") == "santa fe"
+    assert matcher.first_containing("palio") is None
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from inventory import InventorySnapshot
+from snapshot_store import (
+    decode_snapshot, encode_snapshot, load_latest_snapshot, read_snapshot, save_snapshot, snapshot_path,
+)
+
+VEHICLES = [
+    {"id": 1, "marca": "Fiat", "modelo": "Argo Drive", "preco": "75.900,00", "ano": "2022", "km": "15000"},
+    {"id": "A2", "marca": "Honda", "modelo": "CB 500", "preco": 32000, "cilindrada": "500",
+     "fotos": ["a.jpg", "b.jpg"]},
+    {"id": 3, "marca": "Ford", "modelo": "Ká", "cor": "Prata", "km": None},
+]
+
+
+def assert_same_snapshot(decoded, snapshot):
+    assert decoded.records == snapshot.records
+    assert [r.data for r in decoded.records] == [r.data for r in snapshot.records]
+    assert list(decoded.price_order) == list(snapshot.price_order)
+    for attribute, column in snapshot.columns.items():
+        decoded_column = decoded.columns[attribute]
+        assert decoded_column.present == column.present
+        assert [decoded_column.by_position[p] for p in sorted(column.present)] == [
+            column.by_position[p] for p in sorted(column.present)
+        ]
+        assert list(decoded_column.values) == list(column.values)
+        assert list(decoded_column.positions) == list(column.positions)
+
+
+@pytest.mark.parametrize("vehicles", [VEHICLES, []])
+def test_encode_decode_round_trip(vehicles):
+    snapshot = InventorySnapshot(vehicles, "2025-01-01T00:00:00")
+
+    decoded = decode_snapshot(encode_snapshot(snapshot))
+
+    assert_same_snapshot(decoded, snapshot)
+    assert decoded.version == snapshot.version
+    assert decoded.updated_at == snapshot.updated_at
+
+
+def test_read_snapshot_keeps_fragments_mapped(tmp_path):
+    snapshot = InventorySnapshot(VEHICLES)
+    assert save_snapshot(snapshot, str(tmp_path))
+
+    decoded = read_snapshot(snapshot_path(snapshot.version, str(tmp_path)))
+
+    assert_same_snapshot(decoded, snapshot)
+    assert all(isinstance(r.json, memoryview) for r in decoded.records)
+    # Fragmentos mapeados servem de chave para reaproveitar registros no próximo snapshot
+    rebuilt = InventorySnapshot(VEHICLES, previous=decoded)
+    assert rebuilt.reused_records == len(VEHICLES)
+
+
+def test_load_latest_snapshot_skips_truncated_version(tmp_path):
+    directory = str(tmp_path)
+    older = InventorySnapshot(VEHICLES[:1])
+    newer = InventorySnapshot(VEHICLES)
+    save_snapshot(older, directory)
+    save_snapshot(newer, directory)
+    path = snapshot_path(newer.version, directory)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) // 2)
+
+    loaded = load_latest_snapshot(directory, json_path=str(tmp_path / "data.json"))
+
+    assert loaded.version == older.version
+    assert loaded.records == older.records
+
+
+def test_load_latest_snapshot_falls_back_to_json_on_wrong_magic(tmp_path):
+    directory = str(tmp_path)
+    snapshot = InventorySnapshot(VEHICLES)
+    save_snapshot(snapshot, directory)
+    path = snapshot_path(snapshot.version, directory)
+    with open(path, "r+b") as f:
+        f.write(b"NOTSNAP!")
+    json_path = tmp_path / "data.json"
+    json_path.write_text('{"veiculos": [{"id": 7, "marca": "Fiat"}]}', encoding="utf-8")
+    # Mesmo mtime: o binário é tentado antes do JSON
+    os.utime(path, (0, 0))
+    os.utime(json_path, (0, 0))
+
+    loaded = load_latest_snapshot(directory, json_path=str(json_path))
+
+    assert [r.id for r in loaded.records] == ["7"]
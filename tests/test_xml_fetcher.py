@@ -0,0 +1,115 @@
+import io
+import json
+
+import requests
+
+import xml_fetcher
+from inventory import InventorySnapshot, VehicleRecord
+from xml_fetcher import (
+    convert_vehicles, download_feed, extract_vehicles, iter_feed_vehicles, iter_xml_vehicles, reset_parse_pool,
+    write_json_export,
+)
+
+
+class NoSeekBytesIO(io.BytesIO):
+    def seek(self, *args):
+        raise AssertionError("o feed não deveria ser relido")
+
+
+def test_iter_xml_vehicles_skips_header_before_container():
+    feed = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed>
+  <header><gerado>2025-01-01</gerado><loja>Loja X</loja></header>
+  <veiculos>
+    <veiculo><id>1</id><marca>Fiat</marca></veiculo>
+    <veiculo><id>2</id><marca>Honda</marca></veiculo>
+  </veiculos>
+  <rodape><total>2</total></rodape>
+</feed>"""
+
+    vehicles = list(iter_xml_vehicles(io.BytesIO(feed)))
+
+    assert vehicles == [{"ID": "1", "marca": "Fiat"}, {"ID": "2", "marca": "Honda"}]
+
+
+def test_iter_xml_vehicles_uses_root_children_without_known_container():
+    feed = b"<feed><veiculo><id>1</id></veiculo><veiculo><id>2</id></veiculo></feed>"
+
+    vehicles = list(iter_xml_vehicles(io.BytesIO(feed)))
+
+    assert vehicles == [{"ID": "1"}, {"ID": "2"}]
+
+
+def test_download_feed_closes_retried_responses(monkeypatch):
+    responses = []
+
+    def fake_get(url, **kwargs):
+        response = requests.Response()
+        response.status_code = 503 if not responses else 200
+        response.url = url
+        response.raw = io.BytesIO(b"{}")
+        responses.append(response)
+        return response
+
+    closed = []
+    monkeypatch.setattr(requests.Response, "close", lambda self: closed.append(self))
+    monkeypatch.setattr(xml_fetcher.requests, "get", fake_get)
+    monkeypatch.setattr(xml_fetcher, "FETCH_BACKOFF", 0)
+
+    response = download_feed("http://feed.example/estoque.json", stream=True)
+
+    assert response is responses[1]
+    assert closed == [responses[0]]
+
+
+def test_iter_feed_vehicles_reads_list_and_veiculos_in_one_pass():
+    assert list(iter_feed_vehicles(NoSeekBytesIO(b'[{"id": 1}, [{"id": 2}]]'))) == [{"id": 1}, {"id": 2}]
+
+    feed = b'{"data": [{"id": 9}], "veiculos": [{"id": 1}, {"id": 2}], "total": 2}'
+    assert list(iter_feed_vehicles(NoSeekBytesIO(feed))) == [{"id": 1}, {"id": 2}]
+
+
+def test_iter_feed_vehicles_matches_extract_vehicles():
+    feeds = [
+        b'{"meta": {"veiculos": []}, "items": [{"id": 3}], "data": [{"id": 1}, {"id": 2}]}',
+        b'{"results": {"id": 4}, "total": 1}',
+        b'{"id": 5, "marca": "Fiat"}',
+    ]
+    for feed in feeds:
+        assert list(iter_feed_vehicles(io.BytesIO(feed))) == extract_vehicles(json.loads(feed))
+
+
+def test_convert_vehicles_derives_records_in_the_process_pool(monkeypatch):
+    feed = [
+        {"ID": i, "marca": "Honda", "modelo": f"CG 160 Titan {i}", "valor": "12.500,00", "ano": "2021"}
+        for i in range(7)
+    ]
+    feed.insert(3, "inválido")
+    serial = convert_vehicles(feed)
+
+    monkeypatch.setattr(xml_fetcher, "PARSE_WORKERS", 2)
+    monkeypatch.setattr(xml_fetcher, "PARSE_CHUNK_SIZE", 2)
+    try:
+        pooled = convert_vehicles(iter(feed))
+    finally:
+        reset_parse_pool()
+
+    assert all(isinstance(record, VehicleRecord) for record in pooled)
+    assert pooled == serial
+    assert [record.cilindrada for record in pooled] == [160.0] * 7
+
+
+def test_json_export_reloads_as_the_same_inventory(tmp_path):
+    records = convert_vehicles([{"ID": 1, "marca": "Fiat", "galeria": ["a.jpg", "b.jpg"]}, {"ID": 2}])
+    data_dict = {"veiculos": records, "_updated_at": "2025-01-01T00:00:00", "_total_count": 2}
+    path = str(tmp_path / "data.json")
+
+    write_json_export(data_dict, path)
+
+    with open(path, encoding="utf-8") as f:
+        exported = json.load(f)
+    assert exported["_total_count"] == 2
+    loaded = InventorySnapshot(exported["veiculos"])
+    assert loaded.records == tuple(records)
+    rebuilt = InventorySnapshot(records, previous=loaded)
+    assert rebuilt.reused_records == 2
@@ -1,8 +1,72 @@
-import requests, json, os
+import requests, json, os, time, hashlib, threading, tempfile, multiprocessing
+import xml.etree.ElementTree as ET
+import ijson
+from ijson.common import ObjectBuilder
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 from unidecode import unidecode
+from inventory import JSON_FILE, VehicleRecord, dumps_json
+from matcher import KeywordMatcher
+from storage import atomic_open
 
-JSON_FILE = "data.json"
+# Download dos feeds: quantos em paralelo, timeout por requisição e política de novas tentativas
+FETCH_WORKERS = int(os.environ.get("XML_FETCH_WORKERS", "8"))
+FETCH_TIMEOUT = float(os.environ.get("XML_FETCH_TIMEOUT", "30"))
+FETCH_RETRIES = int(os.environ.get("XML_FETCH_RETRIES", "2"))
+FETCH_BACKOFF = float(os.environ.get("XML_FETCH_BACKOFF", "1.0"))
+
+# Modo streaming: o feed é gravado em arquivo temporário e convertido veículo a veículo
+STREAM_PARSE = os.environ.get("XML_STREAM_PARSE", "0") == "1"
+STREAM_CHUNK_BYTES = 64 * 1024
+STREAM_SPOOL_BYTES = int(os.environ.get("XML_STREAM_SPOOL_BYTES", str(8 * 1024 * 1024)))
+
+# Conversão em paralelo (padronização e campos derivados dos registros): processos
+# (0 ou 1 = em série, no processo principal) e veículos por bloco
+PARSE_WORKERS = int(os.environ.get("XML_PARSE_WORKERS", "0"))
+PARSE_CHUNK_SIZE = max(1, int(os.environ.get("XML_PARSE_CHUNK_SIZE", "500")))
+
+# Chaves onde os feeds costumam trazer a lista de veículos (em ordem de prioridade)
+POSSIBLE_KEYS = ['veiculos', 'vehicles', 'data', 'items', 'results', 'content']
+
+# Chaves aceitas para cada campo do veículo padronizado (em ordem de prioridade)
+FIELD_ALIASES = {
+    "id": ["id", "ID", "codigo", "cod"],
+    "tipo": ["tipo", "type", "categoria_veiculo"],
+    "versao": ["versao", "version", "variant"],
+    "marca": ["marca", "brand", "fabricante"],
+    "modelo": ["modelo", "model", "nome"],
+    "ano": ["ano_mod", "anoModelo", "ano", "year_model", "ano_modelo"],
+    "ano_fabricacao": ["ano_fab", "anoFabricacao", "ano_fabricacao", "year_manufacture"],
+    "km": ["km", "quilometragem", "mileage", "kilometers"],
+    "cor": ["cor", "color", "colour"],
+    "combustivel": ["combustivel", "fuel", "fuel_type"],
+    "cambio": ["cambio", "transmission", "gear"],
+    "motor": ["motor", "engine", "motorization"],
+    "portas": ["portas", "doors", "num_doors"],
+    "categoria": ["categoria", "category", "class"],
+    "cilindrada": ["cilindrada", "displacement", "engine_size"],
+    "preco": ["valor", "valorVenda", "preco", "price", "value"],
+    "opcionais": ["opcionais", "options", "extras", "features"],
+    "fotos": ["galeria", "fotos", "photos", "images", "gallery"],
+}
+
+# Tags XML costumam vir em maiúsculas: mapeia a forma minúscula para a chave aceita
+_ALIAS_BY_LOWER = {alias.lower(): alias for aliases in FIELD_ALIASES.values() for alias in aliases}
+
+# Tags de elementos XML que agrupam a lista de veículos
+XML_CONTAINER_TAGS = set(POSSIBLE_KEYS) | {"estoque", "stock", "ads", "anuncios", "listings", "inventory"}
+
+# Cache por URL: validadores HTTP (ETag/Last-Modified), hash do conteúdo e veículos já convertidos
+_feed_cache = {}
+_feed_cache_lock = threading.Lock()
+
+# Pool de processos da conversão paralela (criado sob demanda)
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
 
 MAPEAMENTO_CILINDRADAS = {
     "g 310": 300, "f 750 gs": 850, "f 850 gs": 850, "f 900": 900, "r 1250": 1250,
@@ -46,15 +110,16 @@ def normalizar_modelo(modelo):
     modelo_norm = modelo_norm.replace(" ", "").replace("-", "").replace("_", "")
     return modelo_norm
 
+# Chaves de MAPEAMENTO_CILINDRADAS normalizadas e compiladas uma única vez
+CILINDRADA_MATCHER = KeywordMatcher(MAPEAMENTO_CILINDRADAS, normalizar_modelo)
+
+@lru_cache(maxsize=4096)
 def inferir_cilindrada(modelo):
+    """Cilindrada da chave mais longa de MAPEAMENTO_CILINDRADAS contida no modelo (memorizada por modelo)"""
     if not modelo:
         return None
-    modelo_norm = normalizar_modelo(modelo)
-    for mapeado, cilindrada in MAPEAMENTO_CILINDRADAS.items():
-        mapeado_norm = normalizar_modelo(mapeado)
-        if mapeado_norm in modelo_norm:
-            return cilindrada
-    return None
+    mapeado = CILINDRADA_MATCHER.longest_contained(normalizar_modelo(modelo))
+    return CILINDRADA_MATCHER.values[mapeado] if mapeado else None
 
 def flatten_data(data):
     """
@@ -111,145 +176,610 @@ def get_xml_urls():
         urls.append(os.environ["XML_URL"])
     return urls
 
+def download_feed(url, headers=None, stream=False):
+    """
+    Baixa um feed com timeout próprio e novas tentativas com backoff exponencial
+    (falhas de conexão, timeouts, 429 e 5xx)
+    """
+    attempt = 0
+    while True:
+        try:
+            response = requests.get(url, timeout=FETCH_TIMEOUT, headers=headers, stream=stream)
+            if response.status_code == 429 or response.status_code >= 500:
+                # Com stream=True a conexão só volta ao pool depois de fechada
+                response.close()
+                response.raise_for_status()
+            return response
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            if attempt >= FETCH_RETRIES:
+                raise
+            delay = FETCH_BACKOFF * (2 ** attempt)
+            attempt += 1
+            print(f"[AVISO] Falha ao baixar {url} ({e}); tentativa {attempt}/{FETCH_RETRIES} em {delay:.1f}s")
+            time.sleep(delay)
+
+def extract_vehicles(data_dict):
+    """
+    Extrai a lista de veículos de um JSON de feed (lista direta ou objeto com lista em chave conhecida)
+    """
+    print(f"[DEBUG] Tipo de data_dict: {type(data_dict)}")
+    
+    # Extrair lista de veículos de forma mais robusta
+    veiculos = []
+    
+    if isinstance(data_dict, list):
+        print(f"[DEBUG] JSON é uma lista direta com {len(data_dict)} itens")
+        veiculos = flatten_data(data_dict)
+        
+    elif isinstance(data_dict, dict):
+        print(f"[DEBUG] JSON é um objeto com chaves: {list(data_dict.keys())}")
+        
+        # Tentar várias chaves possíveis para encontrar os veículos
+        for key in POSSIBLE_KEYS:
+            if key in data_dict:
+                print(f"[DEBUG] Encontrou dados na chave '{key}'")
+                veiculos = flatten_data(data_dict[key])
+                break
+        
+        # Se não encontrou em nenhuma chave conhecida, tratar o próprio dict como veículo
+        if not veiculos and data_dict:
+            print(f"[DEBUG] Tratando objeto inteiro como veículo único")
+            veiculos = [data_dict]
+    
+    else:
+        print(f"[AVISO] Tipo de dados não suportado: {type(data_dict)}")
+        return None
+    
+    return veiculos
+
+def _build_value(events, event, value):
+    """
+    Monta um valor completo (objeto, lista ou escalar) a partir dos eventos do ijson
+    """
+    builder = ObjectBuilder()
+    builder.event(event, value)
+    depth = 1 if event in ("start_map", "start_array") else 0
+    while depth:
+        _, event, value = next(events)
+        builder.event(event, value)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+    return builder.value
+
+def _skip_value(events, event):
+    """
+    Consome os eventos de um valor sem montá-lo
+    """
+    depth = 1 if event in ("start_map", "start_array") else 0
+    while depth:
+        _, event, _ = next(events)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+
+def _iter_array_items(events):
+    """
+    Gera os objetos de uma lista já aberta, achatando listas aninhadas (como flatten_data)
+    """
+    for _, event, value in events:
+        if event == "end_array":
+            return
+        if event == "start_map":
+            yield _build_value(events, event, value)
+        elif event == "start_array":
+            yield from _iter_array_items(events)
+        else:
+            print(f"[AVISO] Item ignorado (tipo não suportado): {type(value)} - {value}")
+
+def _top_level_keys(events):
+    """
+    Chaves do objeto no topo do documento (eventos logo após o start_map), sem montar valores.
+    
+    A varredura para em POSSIBLE_KEYS[0]: nenhuma chave seguinte tem prioridade sobre ela
+    e os eventos ficam posicionados no início do seu valor.
+    """
+    keys = []
+    for _, event, value in events:
+        if event == "end_map":
+            break
+        keys.append(value)
+        if value == POSSIBLE_KEYS[0]:
+            break
+        _, event, _ = next(events)
+        _skip_value(events, event)
+    return keys
+
+def _iter_value_vehicles(events):
+    """
+    Gera os veículos do valor que começa no próximo evento (lista em streaming ou valor único)
+    """
+    _, event, value = next(events)
+    if event == "start_array":
+        yield from _iter_array_items(events)
+    else:
+        yield from flatten_data(_build_value(events, event, value))
+
+def iter_feed_vehicles(fileobj):
+    """
+    Versão em streaming de extract_vehicles: gera um veículo por vez sem carregar o feed inteiro.
+    
+    Listas diretas e objetos com 'veiculos' são lidos numa única passada. Nos demais objetos
+    o arquivo precisa permitir seek: a primeira passada lê só as chaves do topo para escolher
+    o contêiner pela prioridade de POSSIBLE_KEYS (como extract_vehicles) e a segunda vai
+    direto ao valor dessa chave.
+    """
+    events = iter(ijson.parse(fileobj, use_float=True))
+    _, event, value = next(events)
+    
+    if event == "start_array":
+        print("[DEBUG] JSON é uma lista direta (streaming)")
+        yield from _iter_array_items(events)
+        return
+    
+    if event != "start_map":
+        print(f"[AVISO] Tipo de dados não suportado: {type(value)}")
+        return
+    
+    keys = _top_level_keys(events)
+    container_key = next((key for key in POSSIBLE_KEYS if key in keys), None)
+    
+    found = 0
+    if container_key is not None:
+        print(f"[DEBUG] Encontrou dados na chave '{container_key}'")
+        if container_key != POSSIBLE_KEYS[0]:
+            # A varredura passou do contêiner: segunda passada até a sua chave
+            fileobj.seek(0)
+            events = iter(ijson.parse(fileobj, use_float=True))
+            next(events)  # start_map
+            for _, _, key in events:
+                if key == container_key:
+                    break
+                _, event, _ = next(events)
+                _skip_value(events, event)
+        for vehicle in _iter_value_vehicles(events):
+            found += 1
+            yield vehicle
+    
+    # Se não encontrou veículos em nenhuma chave conhecida, tratar o próprio objeto como veículo
+    if not found:
+        fileobj.seek(0)
+        events = iter(ijson.parse(fileobj, use_float=True))
+        _, event, value = next(events)
+        top_level = _build_value(events, event, value)
+        if top_level:
+            print("[DEBUG] Tratando objeto inteiro como veículo único")
+            yield top_level
+
+def _xml_tag(elem):
+    """
+    Nome da tag sem namespace
+    """
+    return elem.tag.rsplit("}", 1)[-1]
+
+def _xml_value(elem):
+    """
+    Converte um elemento XML: texto nas folhas, lista quando os filhos repetem a mesma tag
+    (ex.: <fotos><foto>...</foto></fotos>) e dicionário nos demais casos
+    """
+    children = list(elem)
+    if not children:
+        text = (elem.text or "").strip()
+        if text:
+            return text
+        return dict(elem.attrib) if elem.attrib else None
+    
+    tags = [_xml_tag(child) for child in children]
+    if len(set(tags)) == 1:
+        return [_xml_value(child) for child in children]
+    return _xml_record(elem)
+
+def _xml_record(elem):
+    """
+    Converte o elemento de um veículo em dicionário (tags repetidas viram listas)
+    """
+    record = {}
+    for key, value in elem.attrib.items():
+        record[_ALIAS_BY_LOWER.get(key.lower(), key)] = value
+    for child in elem:
+        tag = _xml_tag(child)
+        key = _ALIAS_BY_LOWER.get(tag.lower(), tag)
+        value = _xml_value(child)
+        if key in record:
+            if not isinstance(record[key], list):
+                record[key] = [record[key]]
+            record[key].append(value)
+        else:
+            record[key] = value
+    return record
+
+def _xml_container_position(fileobj):
+    """
+    Primeira passada do XML: índice do primeiro filho da raiz com tag de contêiner
+    conhecida, ou None se o contêiner for a própria raiz (tag conhecida ou nenhum filho
+    conhecido). Os filhos já percorridos são liberados.
+    """
+    depth = -1
+    index = -1
+    root = None
+    for event, elem in ET.iterparse(fileobj, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            tag = _xml_tag(elem).lower()
+            if depth == 0:
+                root = elem
+                if tag in XML_CONTAINER_TAGS:
+                    return None
+            elif depth == 1:
+                index += 1
+                if tag in XML_CONTAINER_TAGS:
+                    return index
+            continue
+        if depth == 1:
+            root.clear()
+        depth -= 1
+    return None
+
+def iter_xml_vehicles(fileobj):
+    """
+    Gera os veículos de um feed XML incrementalmente (iterparse), liberando cada
+    elemento depois de convertido.
+    
+    Os veículos são os filhos do elemento contêiner: a raiz, se a tag dela for um
+    contêiner conhecido (XML_CONTAINER_TAGS), ou o primeiro filho da raiz com tag
+    conhecida; caso contrário, os próprios filhos da raiz. O arquivo precisa permitir
+    seek: uma primeira passada localiza o contêiner.
+    """
+    position = _xml_container_position(fileobj)
+    fileobj.seek(0)
+    
+    container_depth = 0 if position is None else 1
+    depth = -1
+    index = -1
+    root = None
+    container = None
+    for event, elem in ET.iterparse(fileobj, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 0:
+                root = elem
+                if position is None:
+                    container = root
+            elif depth == 1:
+                index += 1
+                if index == position:
+                    container = elem
+            if elem is container and _xml_tag(elem).lower() in XML_CONTAINER_TAGS:
+                print(f"[DEBUG] Encontrou veículos no elemento XML '{_xml_tag(elem)}'")
+            continue
+        
+        if container is not None and depth == container_depth + 1:
+            yield _xml_record(elem)
+            container.clear()  # Libera os veículos já processados
+        elif depth == 1:
+            if elem is container:
+                return  # Contêiner encerrado: o restante do documento não tem veículos
+            root.clear()  # Libera filhos da raiz anteriores ao contêiner (ex.: cabeçalho)
+        depth -= 1
+
+def _starts_with_xml(fileobj):
+    """
+    Verifica se o corpo (arquivo posicionado no início) começa com '<'
+    """
+    head = fileobj.read(64)
+    fileobj.seek(0)
+    return head.lstrip(b"\xef\xbb\xbf \t\r\n")[:1] == b"<"
+
+def is_xml_feed(url, response, body):
+    """
+    Identifica feeds XML pelo Content-Type, pela extensão da URL ou pelo início do corpo
+    """
+    content_type = response.headers.get("Content-Type", "").lower()
+    if "xml" in content_type:
+        return True
+    if "json" in content_type:
+        return False
+    if url.split("?", 1)[0].lower().endswith(".xml"):
+        return True
+    return _starts_with_xml(body)
+
+def parse_vehicle(v):
+    """
+    Converte um veículo do feed para o formato padronizado
+    """
+    # Extrair dados de forma segura
+    parsed = {
+        "id": safe_get_value(v, FIELD_ALIASES["id"]),
+        "tipo": safe_get_value(v, FIELD_ALIASES["tipo"]),
+        "versao": safe_get_value(v, FIELD_ALIASES["versao"]),
+        "marca": safe_get_value(v, FIELD_ALIASES["marca"]),
+        "modelo": safe_get_value(v, FIELD_ALIASES["modelo"]),
+        "ano": safe_get_value(v, FIELD_ALIASES["ano"]),
+        "ano_fabricacao": safe_get_value(v, FIELD_ALIASES["ano_fabricacao"]),
+        "km": safe_get_value(v, FIELD_ALIASES["km"]),
+        "cor": safe_get_value(v, FIELD_ALIASES["cor"]),
+        "combustivel": safe_get_value(v, FIELD_ALIASES["combustivel"]),
+        "cambio": safe_get_value(v, FIELD_ALIASES["cambio"]),
+        "motor": safe_get_value(v, FIELD_ALIASES["motor"]),
+        "portas": safe_get_value(v, FIELD_ALIASES["portas"]),
+        "categoria": safe_get_value(v, FIELD_ALIASES["categoria"]),
+        "cilindrada": safe_get_value(v, FIELD_ALIASES["cilindrada"]),
+        "preco": 0,
+        "opcionais": "",
+        "fotos": safe_get_value(v, FIELD_ALIASES["fotos"], [])
+    }
+    
+    # Inferir cilindrada se não estiver presente
+    if not parsed["cilindrada"]:
+        parsed["cilindrada"] = inferir_cilindrada(parsed["modelo"])
+    
+    # Tratar preço de forma mais robusta
+    preco_raw = safe_get_value(v, FIELD_ALIASES["preco"])
+    if preco_raw:
+        try:
+            if isinstance(preco_raw, str):
+                # Remove caracteres não numéricos exceto ponto e vírgula
+                preco_clean = ''.join(c for c in preco_raw if c.isdigit() or c in '.,')
+                preco_clean = preco_clean.replace(',', '.')
+                parsed["preco"] = float(preco_clean) if preco_clean else 0
+            else:
+                parsed["preco"] = float(preco_raw)
+        except (ValueError, TypeError):
+            parsed["preco"] = 0
+    
+    # Tratar opcionais
+    opcionais_raw = safe_get_value(v, FIELD_ALIASES["opcionais"])
+    if isinstance(opcionais_raw, list):
+        parsed["opcionais"] = ", ".join(str(item) for item in opcionais_raw if item)
+    elif opcionais_raw:
+        parsed["opcionais"] = str(opcionais_raw)
+    
+    # Garantir que fotos seja uma lista
+    if not isinstance(parsed["fotos"], list):
+        if parsed["fotos"]:
+            parsed["fotos"] = [parsed["fotos"]]
+        else:
+            parsed["fotos"] = []
+    
+    return parsed
+
+def remember_feed(url, response, content_hash, vehicles):
+    """
+    Guarda validadores e registros convertidos de um feed para a próxima atualização
+    """
+    with _feed_cache_lock:
+        _feed_cache[url] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_hash": content_hash,
+            "vehicles": list(vehicles),
+        }
+
+def convert_chunk(numbered_vehicles):
+    """
+    Converte uma sequência de (índice, veículo) em VehicleRecords prontos para o snapshot
+    (veículo padronizado, JSON serializado, campos normalizados e numéricos), ignorando os inválidos
+    """
+    parsed_vehicles = []
+    
+    # Processar cada veículo
+    for i, v in numbered_vehicles:
+        try:
+            # Verificação de segurança
+            if not isinstance(v, dict):
+                print(f"[AVISO] Veículo {i+1} não é um dicionário: {type(v)}")
+                continue
+            
+            parsed_vehicles.append(VehicleRecord.from_vehicle(parse_vehicle(v)))
+            
+        except Exception as e:
+            print(f"[ERRO] Erro ao processar veículo {i+1}: {e}")
+            continue
+    
+    return parsed_vehicles
+
+def get_parse_pool():
+    """
+    Pool de processos compartilhado pelos feeds (criado na primeira utilização)
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn: o processo principal tem threads (scheduler, downloads) e fork não é seguro
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _parse_pool
+
+def reset_parse_pool():
+    """
+    Descarta o pool de processos (ex.: após um worker morrer)
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def convert_vehicles(veiculos):
+    """
+    Converte os veículos de um feed (lista ou gerador) em VehicleRecords, ignorando os inválidos.
+    Com XML_PARSE_WORKERS > 1 os veículos são convertidos em blocos num pool de
+    processos, que devolvem os registros já derivados: o processo principal só os
+    recebe, na ordem original. No máximo
+    2 × XML_PARSE_WORKERS blocos ficam em andamento, e cada bloco é liberado
+    assim que seu resultado é consumido.
+    """
+    numbered_vehicles = enumerate(veiculos)
+    if PARSE_WORKERS <= 1:
+        return convert_chunk(numbered_vehicles)
+    
+    chunks = iter(lambda: list(islice(numbered_vehicles, PARSE_CHUNK_SIZE)), [])
+    pending = deque()  # blocos ainda não consumidos, em ordem
+    futures = deque()  # conversão de cada bloco enviado ao pool
+    parsed_vehicles = []
+    
+    def consume_oldest():
+        parsed_vehicles.extend(futures[0].result())
+        futures.popleft()
+        pending.popleft()
+    
+    try:
+        pool = get_parse_pool()
+        for chunk in chunks:
+            pending.append(chunk)
+            futures.append(pool.submit(convert_chunk, chunk))
+            if len(futures) >= 2 * PARSE_WORKERS:
+                consume_oldest()
+        while futures:
+            consume_oldest()
+        return parsed_vehicles
+    except (BrokenProcessPool, OSError) as e:
+        print(f"[AVISO] Pool de processos indisponível ({e}), convertendo em série os blocos restantes")
+        reset_parse_pool()
+        for chunk in pending:
+            parsed_vehicles.extend(convert_chunk(chunk))
+        parsed_vehicles.extend(convert_chunk(numbered_vehicles))  # restante ainda não lido
+        return parsed_vehicles
+
+def reuse_unchanged_feed(url, response, content_hash, cached):
+    """
+    Se o conteúdo é idêntico ao último download, retorna a conversão anterior (senão None)
+    """
+    if cached and cached["content_hash"] == content_hash:
+        print(f"[INFO] Feed sem alterações, reutilizando {len(cached['vehicles'])} veículos: {url}")
+        remember_feed(url, response, content_hash, cached["vehicles"])
+        return list(cached["vehicles"])
+    return None
+
+def load_json_body(body, response):
+    """
+    Carrega o corpo JSON inteiro, decodificado como response.json() faria
+    """
+    raw = body.read()
+    if response.encoding:
+        try:
+            return json.loads(str(raw, response.encoding, errors="replace"))
+        except LookupError:
+            pass  # Encoding desconhecido: deixa o json detectar UTF-8/16/32
+    return json.loads(raw)
+
+def process_feed_body(JSON_URL, response, cached):
+    """
+    Grava o corpo do feed em arquivo temporário (em memória até STREAM_SPOOL_BYTES) e o
+    converte: XML e, no modo streaming, JSON são lidos incrementalmente (memória limitada
+    a um veículo por vez mais o resultado)
+    """
+    with tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_BYTES) as body:
+        # Hash calculado durante o download
+        digest = hashlib.sha256()
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_BYTES):
+            digest.update(chunk)
+            body.write(chunk)
+        content_hash = digest.hexdigest()
+        
+        # Conteúdo idêntico ao último download: reutiliza a conversão anterior
+        reused = reuse_unchanged_feed(JSON_URL, response, content_hash, cached)
+        if reused is not None:
+            return reused
+        
+        body.seek(0)
+        try:
+            # Feeds XML são sempre convertidos incrementalmente
+            if is_xml_feed(JSON_URL, response, body):
+                parsed_vehicles = convert_vehicles(iter_xml_vehicles(body))
+                print(f"[INFO] {len(parsed_vehicles)} veículos convertidos em streaming")
+            elif STREAM_PARSE:
+                parsed_vehicles = convert_vehicles(iter_feed_vehicles(body))
+                print(f"[INFO] {len(parsed_vehicles)} veículos convertidos em streaming")
+            else:
+                veiculos = extract_vehicles(load_json_body(body, response))
+                if veiculos is None:
+                    return []
+                print(f"[INFO] Processando {len(veiculos)} veículos encontrados")
+                parsed_vehicles = convert_vehicles(veiculos)
+        except (json.JSONDecodeError, ijson.JSONError) as je:
+            print(f"[ERRO] JSON inválido na URL {JSON_URL}: {je}")
+            return []
+        except ET.ParseError as xe:
+            print(f"[ERRO] XML inválido na URL {JSON_URL}: {xe}")
+            return []
+    
+    remember_feed(JSON_URL, response, content_hash, parsed_vehicles)
+    return parsed_vehicles
+
+def process_feed(JSON_URL):
+    """
+    Baixa e converte um feed; erros ficam restritos a este feed (retorna lista vazia)
+    """
+    print(f"[INFO] Processando URL: {JSON_URL}")
+    parsed_vehicles = []
+    try:
+        with _feed_cache_lock:
+            cached = _feed_cache.get(JSON_URL)
+        
+        # Requisição condicional: o servidor responde 304 se o feed não mudou
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+        
+        # O corpo é sempre lido em partes: nunca fica inteiro na resposta
+        response = download_feed(JSON_URL, headers, stream=True)
+        with response:
+            if response.status_code == 304 and cached:
+                print(f"[INFO] Feed não modificado (304), reutilizando {len(cached['vehicles'])} veículos: {JSON_URL}")
+                return list(cached["vehicles"])
+            response.raise_for_status()
+            
+            parsed_vehicles = process_feed_body(JSON_URL, response, cached)
+                
+    except requests.RequestException as req_error:
+        print(f"[ERRO] Erro de requisição para URL {JSON_URL}: {req_error}")
+    except Exception as url_error:
+        print(f"[ERRO] Erro geral na URL {JSON_URL}: {url_error}")
+    
+    return parsed_vehicles
+
+def write_json_export(data_dict, path=JSON_FILE):
+    """
+    Grava o resultado no formato do data.json reaproveitando o JSON já serializado de cada registro
+    """
+    metadata = {key: value for key, value in data_dict.items() if key != "veiculos"}
+    with atomic_open(path, "wb") as f:
+        f.write(b'{"veiculos":[')
+        f.write(b",".join(record.json for record in data_dict["veiculos"]))
+        f.write(b"]," + dumps_json(metadata)[1:] if metadata else b"]}")
+
 def fetch_and_convert_xml():
     try:
         JSON_URLS = get_xml_urls()
         if not JSON_URLS:
             raise ValueError("Nenhuma variável XML_URL definida")
 
-        parsed_vehicles = []
+        # Baixa os feeds em paralelo; a junção segue a ordem das URLs (determinística)
+        workers = max(1, min(FETCH_WORKERS, len(JSON_URLS)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            feed_results = list(executor.map(process_feed, JSON_URLS))
 
-        for JSON_URL in JSON_URLS:
-            print(f"[INFO] Processando URL: {JSON_URL}")
-            try:
-                response = requests.get(JSON_URL, timeout=30)
-                response.raise_for_status()
-                
-                # Parse do JSON
-                try:
-                    data_dict = response.json()
-                except json.JSONDecodeError as je:
-                    print(f"[ERRO] JSON inválido na URL {JSON_URL}: {je}")
-                    continue
-                
-                print(f"[DEBUG] Tipo de data_dict: {type(data_dict)}")
-                
-                # Extrair lista de veículos de forma mais robusta
-                veiculos = []
-                
-                if isinstance(data_dict, list):
-                    print(f"[DEBUG] JSON é uma lista direta com {len(data_dict)} itens")
-                    veiculos = flatten_data(data_dict)
-                    
-                elif isinstance(data_dict, dict):
-                    print(f"[DEBUG] JSON é um objeto com chaves: {list(data_dict.keys())}")
-                    
-                    # Tentar várias chaves possíveis para encontrar os veículos
-                    possible_keys = ['veiculos', 'vehicles', 'data', 'items', 'results', 'content']
-                    
-                    for key in possible_keys:
-                        if key in data_dict:
-                            print(f"[DEBUG] Encontrou dados na chave '{key}'")
-                            veiculos = flatten_data(data_dict[key])
-                            break
-                    
-                    # Se não encontrou em nenhuma chave conhecida, tratar o próprio dict como veículo
-                    if not veiculos and data_dict:
-                        print(f"[DEBUG] Tratando objeto inteiro como veículo único")
-                        veiculos = [data_dict]
-                
-                else:
-                    print(f"[AVISO] Tipo de dados não suportado: {type(data_dict)}")
-                    continue
-                
-                print(f"[INFO] Processando {len(veiculos)} veículos encontrados")
-                
-                # Processar cada veículo
-                for i, v in enumerate(veiculos):
-                    try:
-                        # Verificação de segurança
-                        if not isinstance(v, dict):
-                            print(f"[AVISO] Veículo {i+1} não é um dicionário: {type(v)}")
-                            continue
-                        
-                        # Extrair dados de forma segura
-                        parsed = {
-                            "id": safe_get_value(v, ["id", "ID", "codigo", "cod"]),
-                            "tipo": safe_get_value(v, ["tipo", "type", "categoria_veiculo"]),
-                            "versao": safe_get_value(v, ["versao", "version", "variant"]),
-                            "marca": safe_get_value(v, ["marca", "brand", "fabricante"]),
-                            "modelo": safe_get_value(v, ["modelo", "model", "nome"]),
-                            "ano": safe_get_value(v, ["ano_mod", "anoModelo", "ano", "year_model", "ano_modelo"]),
-                            "ano_fabricacao": safe_get_value(v, ["ano_fab", "anoFabricacao", "ano_fabricacao", "year_manufacture"]),
-                            "km": safe_get_value(v, ["km", "quilometragem", "mileage", "kilometers"]),
-                            "cor": safe_get_value(v, ["cor", "color", "colour"]),
-                            "combustivel": safe_get_value(v, ["combustivel", "fuel", "fuel_type"]),
-                            "cambio": safe_get_value(v, ["cambio", "transmission", "gear"]),
-                            "motor": safe_get_value(v, ["motor", "engine", "motorization"]),
-                            "portas": safe_get_value(v, ["portas", "doors", "num_doors"]),
-                            "categoria": safe_get_value(v, ["categoria", "category", "class"]),
-                            "cilindrada": safe_get_value(v, ["cilindrada", "displacement", "engine_size"]),
-                            "preco": 0,
-                            "opcionais": "",
-                            "fotos": safe_get_value(v, ["galeria", "fotos", "photos", "images", "gallery"], [])
-                        }
-                        
-                        # Inferir cilindrada se não estiver presente
-                        if not parsed["cilindrada"]:
-                            parsed["cilindrada"] = inferir_cilindrada(parsed["modelo"])
-                        
-                        # Tratar preço de forma mais robusta
-                        preco_raw = safe_get_value(v, ["valor", "valorVenda", "preco", "price", "value"])
-                        if preco_raw:
-                            try:
-                                if isinstance(preco_raw, str):
-                                    # Remove caracteres não numéricos exceto ponto e vírgula
-                                    preco_clean = ''.join(c for c in preco_raw if c.isdigit() or c in '.,')
-                                    preco_clean = preco_clean.replace(',', '.')
-                                    parsed["preco"] = float(preco_clean) if preco_clean else 0
-                                else:
-                                    parsed["preco"] = float(preco_raw)
-                            except (ValueError, TypeError):
-                                parsed["preco"] = 0
-                        
-                        # Tratar opcionais
-                        opcionais_raw = safe_get_value(v, ["opcionais", "options", "extras", "features"])
-                        if isinstance(opcionais_raw, list):
-                            parsed["opcionais"] = ", ".join(str(item) for item in opcionais_raw if item)
-                        elif opcionais_raw:
-                            parsed["opcionais"] = str(opcionais_raw)
-                        
-                        # Garantir que fotos seja uma lista
-                        if not isinstance(parsed["fotos"], list):
-                            if parsed["fotos"]:
-                                parsed["fotos"] = [parsed["fotos"]]
-                            else:
-                                parsed["fotos"] = []
-                        
-                        parsed_vehicles.append(parsed)
-                        
-                    except Exception as e:
-                        print(f"[ERRO] Erro ao processar veículo {i+1}: {e}")
-                        continue
-                        
-            except requests.RequestException as req_error:
-                print(f"[ERRO] Erro de requisição para URL {JSON_URL}: {req_error}")
-                continue
-            except Exception as url_error:
-                print(f"[ERRO] Erro geral na URL {JSON_URL}: {url_error}")
-                continue
+        parsed_vehicles = []
+        for feed_vehicles in feed_results:
+            parsed_vehicles.extend(feed_vehicles)
 
-        # Criar resultado final
+        # Criar resultado final ('veiculos' traz os VehicleRecords já derivados)
         data_dict = {
             "veiculos": parsed_vehicles,
             "_updated_at": datetime.now().isoformat(),
             "_total_count": len(parsed_vehicles)
         }
 
-        # Salvar arquivo
+        # Exportação compacta (depuração e fallback quando não há snapshot binário legível)
         try:
-            with open(JSON_FILE, "w", encoding="utf-8") as f:
-                json.dump(data_dict, f, ensure_ascii=False, indent=2)
+            write_json_export(data_dict)
             print(f"[OK] Arquivo {JSON_FILE} salvo com sucesso!")
         except Exception as save_error:
             print(f"[ERRO] Erro ao salvar arquivo: {save_error}")
@@ -273,5 +803,6 @@ if __name__ == "__main__":
     
     if total_vehicles > 0:
         print("\nPrimeiros 3 veículos processados:")
-        for i, veiculo in enumerate(result['veiculos'][:3]):
+        for i, record in enumerate(result['veiculos'][:3]):
+            veiculo = record.data
             print(f"{i+1}. {veiculo.get('marca', 'N/A')} {veiculo.get('modelo', 'N/A')} - R$ {veiculo.get('preco', 0)}")